@@ -0,0 +1,14 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# the modules are imported on demand, e.g. hlir16.hlir_attrs is available after "import hlir16.hlir"
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    try:
+        return importlib.import_module(f'{__name__}.{name}')
+    except ModuleNotFoundError as error:
+        if error.name != f'{__name__}.{name}':
+            raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_corpus.py
+#         PYTHONPATH=.. python3 bench_corpus.py --save-baseline baseline.json
+#         PYTHONPATH=.. python3 bench_corpus.py --compare baseline.json --threshold 0.25
+# the corpus is the p4test --toJSON output (optionally gzipped) in the bench_corpus directory;
+# the programs there are synthetic, and can be regenerated by gen_p4json.py (see the README)
+
+import argparse
+import gc
+import glob
+import gzip
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import hlir16.hlir
+from hlir16.hlir_attrs import default_attr_funs, attr_fun_name
+from hlir16.hlir_utils import reachable_nodes
+
+
+default_corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_corpus')
+
+# a stage is only reported as a regression if it got slower by at least this much (in seconds)
+default_min_delta = 0.010
+
+
+def corpus_files(dirname):
+    return sorted(glob.glob(os.path.join(dirname, '*.json')) + glob.glob(os.path.join(dirname, '*.json.gz')))
+
+
+def fixture_name(filename):
+    name = os.path.basename(filename)
+    return name[:-len('.gz')] if name.endswith('.gz') else name
+
+
+def read_text(filename):
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt') as json_in:
+        return json_in.read()
+
+
+def load_stages(text, p4_filename):
+    """Loads the program from its JSON text, and returns the runtime of each stage (in seconds) and the HLIR."""
+    times = {}
+    start = time.perf_counter()
+    json_root = json.loads(text)
+    times['json_parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hlir = hlir16.hlir.walk_json_from_top(json_root)
+    times['walk_json'] = time.perf_counter() - start
+    times['walk_json_nodes'] = len(hlir.all_nodes)
+
+    for fun in default_attr_funs(p4_filename, 16):
+        start = time.perf_counter()
+        fun(hlir)
+        times[f'attrs/{attr_fun_name(fun)}'] = time.perf_counter() - start
+
+    return times, hlir
+
+
+def peak_memory(text, p4_filename):
+    """The peak memory (in bytes) that is allocated while the program is loaded, as measured by tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        load_stages(text, p4_filename)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_fixture(filename, repeat):
+    """Loads the fixture repeatedly, and returns the best time of each stage, the node counts and the peak memory.
+    As in timeit, the garbage collector is disabled during the timed runs, as its pauses make the timings noisy."""
+    text = read_text(filename)
+    p4_filename = fixture_name(filename).replace('.json', '.p4')
+
+    stages = {}
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            times, hlir = load_stages(text, p4_filename)
+        finally:
+            gc.enable()
+        walk_nodes = times.pop('walk_json_nodes')
+        for stage, stage_time in times.items():
+            stages[stage] = min(stage_time, stages.get(stage, stage_time))
+
+    return {
+        'stages': stages,
+        'total': sum(stages.values()),
+        'json_bytes': len(text),
+        'nodes_after_walk': walk_nodes,
+        'nodes_after_attrs': len(reachable_nodes(hlir)),
+        'peak_memory': peak_memory(text, p4_filename),
+    }
+
+
+def bench_corpus(filenames, repeat):
+    return {fixture_name(filename): bench_fixture(filename, repeat) for filename in filenames}
+
+
+def find_regressions(results, baseline, threshold, min_delta=default_min_delta):
+    """Lists the stages (and the peak memory) that are worse than in the baseline by more than the threshold (a ratio)."""
+    regressions = []
+    for fixture, result in results.items():
+        if (base := baseline['fixtures'].get(fixture)) is None:
+            continue
+        for stage, stage_time in list(result['stages'].items()) + [('total', result['total'])]:
+            base_time = base['total'] if stage == 'total' else base['stages'].get(stage)
+            if base_time is not None and stage_time > base_time * (1 + threshold) and stage_time - base_time > min_delta:
+                regressions.append(f'{fixture} {stage}: {base_time:.4f}s -> {stage_time:.4f}s')
+        if result['peak_memory'] > base['peak_memory'] * (1 + threshold):
+            regressions.append(f"{fixture} peak memory: {base['peak_memory']} -> {result['peak_memory']} bytes")
+        for count in ('nodes_after_walk', 'nodes_after_attrs'):
+            if result[count] != base[count]:
+                regressions.append(f'{fixture} {count}: {base[count]} -> {result[count]} (the HLIR has changed)')
+    return regressions
+
+
+def print_results(results, baseline=None, top=8):
+    for fixture, result in results.items():
+        base = (baseline or {}).get('fixtures', {}).get(fixture)
+        print(f"{fixture}: {result['nodes_after_walk']} nodes after walk, {result['nodes_after_attrs']} after attrs, "
+              f"peak memory {result['peak_memory'] / 2**20:.1f} MiB, total {result['total']:.3f}s")
+
+        stages = sorted(result['stages'].items(), key=lambda item: -item[1])
+        for stage, stage_time in [item for item in stages if not item[0].startswith('attrs/')] + [item for item in stages if item[0].startswith('attrs/')][:top]:
+            base_txt = f"  (baseline {base['stages'][stage]:.4f}s)" if base is not None and stage in base['stages'] else ''
+            print(f'    {stage:45} {stage_time:8.4f}s{base_txt}')
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Benchmarks the loading of the programs of a corpus, stage by stage')
+    parser.add_argument('files', nargs='*', help=f'JSON files (default: the ones in {default_corpus_dir})')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs (the best time of each stage is kept)')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Saves the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='Compares the results to a baseline, and fails on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown/memory growth as a ratio (default: 0.25)')
+    parser.add_argument('--top', type=int, default=8, help='Number of attribute passes shown per fixture')
+    args = parser.parse_args(args)
+
+    filenames = args.files or corpus_files(default_corpus_dir)
+    if filenames == []:
+        print('No JSON files found')
+        return 2
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as baseline_in:
+            baseline = json.load(baseline_in)
+
+    results = bench_corpus(filenames, args.repeat)
+    print_results(results, baseline, args.top)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_out:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'repeat': args.repeat, 'fixtures': results}, baseline_out, indent=2)
+        print(f'Baseline saved to {args.save_baseline}')
+
+    if baseline is not None:
+        if (regressions := find_regressions(results, baseline, args.threshold)) != []:
+            print(f'{len(regressions)} regressions (threshold {args.threshold:.0%}):')
+            for regression in regressions:
+                print(f'    {regression}')
+            return 1
+        print(f'No regressions (threshold {args.threshold:.0%})')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
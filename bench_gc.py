@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_gc.py
+#         PYTHONPATH=.. python3 bench_gc.py --scales 1 4 16 --repeat 5
+
+import argparse
+import gc
+import json
+import sys
+import time
+
+import hlir16.hlir
+from hlir16.hlir import bulk_build, GcStats
+from hlir16.hlir_attrs import set_additional_attrs
+from hlir16.gen_p4json import generate
+from hlir16.bench_scaling import scaled_sizes
+
+
+default_scales = (1, 4, 16)
+default_varied = ('headers', 'controls')
+
+# plain: the collector runs as usual; bulk: it is suspended while the HLIR is built;
+# frozen: it is also suspended, and the HLIR is frozen at the end
+modes = ('plain', 'bulk', 'frozen')
+
+
+def load(text, mode):
+    """Loads the program (parsing, walking and the attribute passes) in the given mode,
+    and returns the HLIR, the load time and the collections during the load."""
+    with GcStats() as gc_stats:
+        start = time.perf_counter()
+        if mode == 'plain':
+            hlir = hlir16.hlir.walk_json_from_top(json.loads(text), bulk=False)
+            set_additional_attrs(hlir, 'synthetic.p4', 16)
+        else:
+            with bulk_build(freeze=mode == 'frozen'):
+                hlir = hlir16.hlir.walk_json_from_top(json.loads(text))
+                set_additional_attrs(hlir, 'synthetic.p4', 16)
+        load_time = time.perf_counter() - start
+    return hlir, load_time, gc_stats
+
+
+def measure(text, mode, repeat):
+    """The best load time, the collections of the load with the smallest total pause,
+    and the pause of a full collection afterwards (while the HLIR is alive)."""
+    result = {'time': None, 'collections': None, 'pause': None, 'max_pause': None, 'full_collection': None}
+    for _ in range(repeat):
+        gc.collect()
+        hlir, load_time, gc_stats = load(text, mode)
+
+        start = time.perf_counter()
+        gc.collect()
+        full_collection = time.perf_counter() - start
+
+        if result['time'] is None or load_time < result['time']:
+            result['time'] = load_time
+        if result['pause'] is None or gc_stats.pause < result['pause']:
+            result.update(collections=gc_stats.collections, pause=gc_stats.pause, max_pause=gc_stats.max_pause)
+        if result['full_collection'] is None or full_collection < result['full_collection']:
+            result['full_collection'] = full_collection
+
+        nodes = len(hlir.all_nodes)
+        del hlir
+        gc.unfreeze()
+    result['nodes'] = nodes
+    return result
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Measures the load time and the garbage collector pauses with and without bulk building')
+    parser.add_argument('--scales', nargs='+', type=int, default=list(default_scales))
+    parser.add_argument('--vary', nargs='+', default=list(default_varied), help=f"The size parameters that are multiplied by the scales (default: {' '.join(default_varied)})")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(args)
+
+    print(f"{'nodes':>8} {'mode':8} {'load':>9} {'collections':>12} {'pauses':>9} {'max pause':>10} {'full collection after':>22}")
+    for scale in sorted(args.scales):
+        text = json.dumps(generate(**scaled_sizes(scale, args.vary)))
+        results = {mode: measure(text, mode, args.repeat) for mode in modes}
+        for mode, result in results.items():
+            speedup = '' if mode == 'plain' else f"  ({results['plain']['time'] / result['time']:.2f}x)"
+            print(f"{result['nodes']:8} {mode:8} {result['time']:8.3f}s {result['collections']:12} {result['pause']:8.3f}s {result['max_pause']:9.4f}s"
+                  f" {result['full_collection']:21.4f}s{speedup}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_hlir.py paths_to program.json
+#         (program.json is the output of p4test --toJSON)
+
+import argparse
+import json
+import sys
+import time
+
+import hlir16.hlir
+from hlir16.hlir_attrs import set_additional_attrs
+from hlir16.p4node import P4Node, iter_paths_to, _paths_matchtype
+from hlir16.hlir_textindex import build_text_index
+
+
+def load_json_hlir(json_file, p4_file=None, p4_version=16):
+    with open(json_file, 'r') as json_in:
+        json_root = json.load(json_in)
+
+    hlir = hlir16.hlir.walk_json_from_top(json_root)
+    set_additional_attrs(hlir, p4_file or json_file, p4_version)
+    return hlir
+
+
+def timed(fun, *args, **kwargs):
+    """Returns the runtime of the function call (in seconds) and its result."""
+    start = time.perf_counter()
+    result = fun(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def legacy_paths_to(node, node_or_value, max_depth=20, path=[], found_nodes=set(), deadline=None):
+    """The recursive search that was used by paths_to before, kept as a baseline.
+    The deadline is not part of the original, it cuts the (potentially very long) search short."""
+    if max_depth < 1 or time.perf_counter() > deadline:
+        return
+
+    if type(node_or_value) is P4Node and node == node_or_value:
+        p4_node_txt = node.name if 'name' in node else None
+        yield (path, '=', p4_node_txt, node)
+        return
+
+    nodetxt = f'{node}' if type(node) is not P4Node else node.name if 'name' in node else None
+
+    if nodetxt is not None and type(node_or_value) is not P4Node and (valuetxt := f'{node_or_value}') in nodetxt:
+        matchtype = _paths_matchtype(nodetxt, valuetxt)
+        yield (path, matchtype, nodetxt, node)
+        return
+
+    founds = found_nodes.copy()
+    founds.add(node)
+
+    if node.node_type == 'all_nodes':
+        return
+    if node.is_vec():
+        new_nodes = ((idx, node[idx]) for idx, elem in enumerate(node.vec))
+    else:
+        new_nodes = ((attr, getattr(node, attr)) for attr in node.xdir(show_colours=False))
+
+    for key, new_node in new_nodes:
+        if type(new_node) is P4Node and new_node not in founds:
+            yield from legacy_paths_to(new_node, node_or_value, max_depth - 1, path + [key], founds, deadline)
+
+
+def count_legacy_results(hlir, value, max_depth, budget):
+    """Returns the number of results, and whether the search has finished within the budget."""
+    deadline = time.perf_counter() + budget
+    count = sum(1 for _ in legacy_paths_to(hlir, value, max_depth=max_depth, deadline=deadline))
+    return count, time.perf_counter() <= deadline
+
+
+def bench_paths_to(hlir, values, max_depth, legacy_budget):
+    print(f'{"searched value":30} {"time":>9} {"results":>8} {"legacy time":>12} {"results":>8} {"speedup":>8}')
+    for value in values:
+        valuetxt = f'{value}' if type(value) is not P4Node else value.str(details=False, show_colours=False)
+
+        new_time, new_results = timed(lambda: list(iter_paths_to(hlir, value, max_depth=max_depth)))
+        legacy_time, (legacy_count, is_finished) = timed(count_legacy_results, hlir, value, max_depth, legacy_budget)
+
+        legacy_txt = f'{legacy_time:11.3f}s' if is_finished else f'>{legacy_budget:10.1f}s'
+        speedup_txt = f'{legacy_time / new_time:7.1f}x' if is_finished else f'>{legacy_budget / new_time:6.1f}x'
+        print(f'{valuetxt[:30]:30} {new_time:8.3f}s {len(new_results):8} {legacy_txt} {legacy_count:8} {speedup_txt}')
+
+
+def bench_text_index(hlir, values, max_depth):
+    build_time, index = timed(build_text_index, hlir)
+    print(f'text index built in {build_time:.3f}s, {len(index.texts)} distinct texts')
+
+    print(f'{"searched value":30} {"search":>9} {"results":>8} {"indexed":>9} {"results":>8} {"speedup":>8}')
+    for value in values:
+        valuetxt = f'{value}' if type(value) is not P4Node else value.str(details=False, show_colours=False)
+
+        search_time, search_results = timed(lambda: list(iter_paths_to(hlir, value, max_depth=max_depth)))
+        index_time, index_results = timed(lambda: list(index.iter_paths(value, max_depth=max_depth)))
+        print(f'{valuetxt[:30]:30} {search_time:8.3f}s {len(search_results):8} {index_time:8.4f}s {len(index_results):8} {search_time / index_time:7.1f}x')
+
+
+def clear_xdir_caches(hlir):
+    for node in hlir.all_nodes.vec:
+        node.__dict__.pop('xdir_cache', None)
+
+
+def bench_str(hlir, repeat):
+    """Renders hlir.all_nodes as the interactive prompt would print it."""
+    print(f'{"rendering":30} {"cold":>9} {"warm":>9}')
+    for txt, render in (('str(hlir.all_nodes)',       lambda: hlir.all_nodes.str()),
+                        ('  without colours',          lambda: hlir.all_nodes.str(show_colours=False)),
+                        ('xdir of all nodes',          lambda: [node.xdir() for node in hlir.all_nodes.vec]),
+                        ('  with details',             lambda: [node.xdir(details=True) for node in hlir.all_nodes.vec])):
+        clear_xdir_caches(hlir)
+        cold_time, _ = timed(render)
+        warm_time = min(timed(render)[0] for _ in range(repeat))
+        print(f'{txt:30} {cold_time:8.3f}s {warm_time:8.3f}s')
+
+
+def default_search_values(hlir):
+    values = ['ethernet', 'dstAddr', 1024]
+    if 'tables' in hlir and len(hlir.tables) > 0:
+        values.append(hlir.tables[-1])
+    return values
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Benchmarks for HLIR operations')
+    parser.add_argument('benchmark', choices=['paths_to', 'text_index', 'str'])
+    parser.add_argument('json_file', help='The output of p4test --toJSON')
+    parser.add_argument('--value', action='append', help='Value to search for (default: some names, a number and a table node)')
+    parser.add_argument('--max-depth', type=int, default=20)
+    parser.add_argument('--legacy-budget', type=float, default=10.0, help='Time limit for a baseline run in seconds')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of warm runs (the best one is shown)')
+    args = parser.parse_args(args)
+
+    load_time, hlir = timed(load_json_hlir, args.json_file)
+    print(f'{args.json_file} loaded in {load_time:.3f}s, {len(hlir.all_nodes)} nodes')
+
+    if args.benchmark == 'paths_to':
+        bench_paths_to(hlir, args.value or default_search_values(hlir), args.max_depth, args.legacy_budget)
+    if args.benchmark == 'text_index':
+        bench_text_index(hlir, args.value or default_search_values(hlir), args.max_depth)
+    if args.benchmark == 'str':
+        bench_str(hlir, args.repeat)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
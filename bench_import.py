@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_import.py
+#         PYTHONPATH=.. python3 bench_import.py --budget hlir16.hlir=25 --top 10
+# the exit status is 1 if an import takes longer than its budget or imports a module that it should not;
+# test_hlir.py checks the modules that must not be imported (but not the times) with pytest
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+
+# the modules whose import is measured, with their default budget in milliseconds (with cached bytecode)
+default_budgets = {
+    'hlir16.p4node': 15,
+    'hlir16.hlir': 25,
+    'hlir16.hlir_attrs': 45,
+}
+
+# modules that must not be imported by importing the given module; they are imported on demand
+default_forbidden = {
+    'hlir16.p4node': ['colored', 'pkgutil', 're', 'json'],
+    'hlir16.hlir': ['colored', 'pkgutil', 'subprocess', 'tempfile', 'hlir16.hlir_attrs', 'hlir16.hlirx_regroup', 'hlir16.hlirx_smem', 'hlir16.hlirx_annots'],
+    'hlir16.hlir_attrs': ['colored', 'pkgutil', 'ujson', 'hlir16.hlirx_regroup', 'hlir16.hlirx_smem', 'hlir16.hlirx_annots'],
+}
+
+
+def parse_importtime(stderr):
+    """Parses the output of python -X importtime into (module, self time, cumulative time, nesting level) tuples; the times are in microseconds."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+    return entries
+
+
+def run_importtime(code, pycache_dir):
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    env['PYTHONPYCACHEPREFIX'] = pycache_dir
+    done = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, stderr=subprocess.PIPE, text=True, check=True)
+    return parse_importtime(done.stderr)
+
+
+def measure_import(module, repeat, pycache_dir):
+    """Imports the module in fresh interpreters, and returns the best time (in milliseconds) and the entries of that run.
+    The modules that the interpreter imports at startup are not counted. The first run only fills the bytecode cache."""
+    startup = {name for name, _, _, _ in run_importtime('pass', pycache_dir)}
+    run_importtime(f'import {module}', pycache_dir)
+
+    best = None
+    for _ in range(repeat):
+        entries = [entry for entry in run_importtime(f'import {module}', pycache_dir) if entry[0] not in startup]
+        total = sum(cumulative for _, _, cumulative, level in entries if level == 0) / 1000
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best
+
+
+def check_imports(modules=None, budgets=default_budgets, repeat=5, top=0, out=None):
+    """Measures the imports of the modules (by default, the ones with a budget), and returns the list of failures:
+    imports that take longer than their budget, and modules that are imported although they should not be.
+    If out is given, the times (and the top slowest imported modules) are printed into it."""
+    failures = []
+    with tempfile.TemporaryDirectory() as pycache_dir:
+        for module in modules or budgets:
+            total, entries = measure_import(module, repeat, pycache_dir)
+            budget = budgets.get(module)
+            if out is not None:
+                budget_txt = f' (budget {budget:.0f}ms)' if budget is not None else ''
+                print(f'{module}: {total:.1f}ms{budget_txt}, {len(entries)} modules imported', file=out)
+                for name, self_us, _, _ in sorted(entries, key=lambda entry: -entry[1])[:top]:
+                    print(f'    {name:40} {self_us / 1000:7.2f}ms', file=out)
+
+            if budget is not None and total > budget:
+                failures.append(f'{module} takes {total:.1f}ms, more than its budget of {budget:.0f}ms')
+            imported = {name for name, _, _, _ in entries}
+            for forbidden in default_forbidden.get(module, []):
+                if forbidden in imported:
+                    failures.append(f'{module} imports {forbidden}')
+    return failures
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Measures the import time of the package with python -X importtime, and checks it against budgets')
+    parser.add_argument('modules', nargs='*', help=f"The modules to import (default: {' '.join(default_budgets)})")
+    parser.add_argument('--budget', action='append', default=[], metavar='MODULE=MS', help='Overrides the budget of a module (in milliseconds)')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs (the best one is kept)')
+    parser.add_argument('--top', type=int, default=5, help='Number of the slowest imported modules shown (by self time)')
+    args = parser.parse_args(args)
+
+    budgets = dict(default_budgets)
+    for budget in args.budget:
+        module, ms = budget.split('=')
+        budgets[module] = float(ms)
+
+    failures = check_imports(args.modules, budgets, args.repeat, args.top, sys.stdout)
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    return 1 if failures != [] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
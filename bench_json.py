@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_json.py
+#         PYTHONPATH=.. python3 bench_json.py --backends json orjson --repeat 10 bench_corpus/many_tables.json.gz
+
+import argparse
+import gc
+import sys
+import time
+
+import hlir16.hlir
+from hlir16.hlir_json import available_backends, json_backend, loads_json
+from hlir16.bench_corpus import corpus_files, default_corpus_dir, fixture_name, read_text
+
+
+def measure(data, backend, repeat):
+    """The best time of parsing the JSON with the backend, and of creating the nodes from the parsed JSON."""
+    best = {'json_parse': None, 'walk_json': None}
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        json_root = loads_json(data, backend)
+        parse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hlir = hlir16.hlir.walk_json_from_top(json_root)
+        walk_time = time.perf_counter() - start
+
+        for stage, stage_time in (('json_parse', parse_time), ('walk_json', walk_time)):
+            if best[stage] is None or stage_time < best[stage]:
+                best[stage] = stage_time
+        del hlir, json_root
+    return best
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Compares the JSON backends on the corpus: parsing, and creating the nodes from the parsed JSON')
+    parser.add_argument('fixtures', nargs='*', help='JSON files (default: the corpus)')
+    parser.add_argument('--backends', nargs='+', help=f"The backends to compare (default: the installed ones, {' '.join(available_backends())})")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(args)
+
+    try:
+        backends = [json_backend(name) for name in args.backends or available_backends()]
+    except ValueError as e:
+        print(e)
+        return 1
+
+    print(f"{'fixture':28} {'backend':9} {'parse':>9} {'walk':>9} {'total':>9} {'vs json':>8}")
+    for filename in args.fixtures or corpus_files(default_corpus_dir):
+        data = read_text(filename).encode()
+        results = {backend: measure(data, backend, args.repeat) for backend in backends}
+        reference = results.get('json')
+        for backend, result in sorted(results.items(), key=lambda item: sum(item[1].values())):
+            total = sum(result.values())
+            speedup = f'{sum(reference.values()) / total:7.2f}x' if reference is not None else ''
+            print(f"{fixture_name(filename)[:28]:28} {backend:9} {result['json_parse']:8.4f}s {result['walk_json']:8.4f}s {total:8.4f}s {speedup:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_p4node.py
+#         PYTHONPATH=.. python3 bench_p4node.py --output results.json
+#         PYTHONPATH=.. python3 bench_p4node.py --baseline results.json
+#         python3 bench_p4node.py --checkout ~/hlir16-main --checkout ~/hlir16-work
+# with --checkout, the benchmarks (of this file) are run on the hlir16 package in the given directories, and compared side by side
+
+import argparse
+import gc
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+default_fixture = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_corpus', 'many_tables.json.gz')
+
+
+def load_fixture(filename):
+    import hlir16.hlir
+    from hlir16.hlir_attrs import set_additional_attrs
+
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt') as json_in:
+        json_root = json.load(json_in)
+    hlir = hlir16.hlir.walk_json_from_top(json_root)
+    set_additional_attrs(hlir, 'benchmark.p4', 16)
+    return hlir
+
+
+def has_parent(node):
+    """Tells if the node has a parent; it works with the parent links of all versions of the package (see --checkout)."""
+    try:
+        return node.parent() is not None
+    except (AttributeError, IndexError):
+        return False
+
+
+def benchmark_cases(hlir):
+    """Returns (name, operation count, function) triples; each function performs the operation on realistic nodes."""
+    from hlir16.p4node import P4Node
+
+    nodes = [node for node in hlir.all_nodes.vec if 'node_type' in node]
+    named = [node for node in nodes if 'name' in node]
+    exprs = [node for node in nodes if node.node_type in ('Member', 'PathExpression') and 'type' in node]
+    with_parents = [node for node in nodes if has_parent(node)]
+    controls = list(hlir.controls)
+    locals_vecs = [control.controlLocals for control in controls if len(control.controlLocals) > 0]
+    vecs = [node for node in nodes if node.is_vec() and len(node.vec) > 0 and all(type(elem) is P4Node for elem in node.vec)]
+    member_paths = ['expr.hdr_ref.name', 'type.name', 'expr.path.name', 'member']
+
+    def getattr_miss():
+        for node in named:
+            try:
+                node.no_such_attribute
+            except AttributeError:
+                pass
+
+    def xdir_uncached():
+        for node in named:
+            node.__dict__.pop('xdir_cache', None)
+            node.xdir(show_colours=False)
+
+    return [
+        ('getattr hit',           len(named),                    lambda: [node.name for node in named]),
+        ('getattr miss',          len(named),                    getattr_miss),
+        ('_attr (optional)',      len(nodes),                    lambda: [node._type for node in nodes]),
+        ('call path (4 steps)',   len(exprs) * len(member_paths), lambda: [expr(path) for expr in exprs for path in member_paths]),
+        ('filter by path',        len(vecs),                     lambda: [vec.filter('node_type', 'P4Table') for vec in vecs]),
+        ('filter by function',    len(vecs),                     lambda: [vec.filter(lambda node: 'name' in node) for vec in vecs]),
+        ('map',                   len(vecs),                     lambda: [vec.map('node_type') for vec in vecs]),
+        ('flatmap',               len(controls),                 lambda: [hlir.controls.flatmap('controlLocals') for _ in controls]),
+        ('by_type',               len(locals_vecs),              lambda: [vec.by_type('P4Table') for vec in locals_vecs]),
+        ('get by name',           len(locals_vecs),              lambda: [vec.get(vec.vec[-1].name) for vec in locals_vecs]),
+        ('getitem by node type',  len(locals_vecs),              lambda: [vec['P4Action'] for vec in locals_vecs]),
+        ('urtype',                len(exprs),                    lambda: [expr.urtype for expr in exprs]),
+        ('parents',               len(with_parents),             lambda: [node.parents for node in with_parents]),
+        ('parent',                len(with_parents),             lambda: [node.parent() for node in with_parents]),
+        ('xdir (cached)',         len(named),                    lambda: [node.xdir(show_colours=False) for node in named]),
+        ('xdir (uncached)',       len(named),                    xdir_uncached),
+    ]
+
+
+def time_case(fun, repeat, min_time=0.2):
+    """As timeit.autorange, finds a loop count that takes at least min_time, and returns the best time of one call from several rounds."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fun()
+        if (elapsed := time.perf_counter() - start) >= min_time:
+            break
+        loops *= 2 if elapsed * 10 > min_time else 10
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fun()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def run_benchmarks(fixture, repeat, selected=None):
+    """Returns a dict: case name -> nanoseconds per operation."""
+    hlir = load_fixture(fixture)
+    results = {}
+    gc.collect()
+    gc.disable()
+    try:
+        for name, op_count, fun in benchmark_cases(hlir):
+            if selected is None or any(sel in name for sel in selected):
+                results[name] = time_case(fun, repeat) / max(1, op_count) * 1e9
+    finally:
+        gc.enable()
+    return results
+
+
+def run_in_checkout(checkout, fixture, repeat, selected):
+    """Runs this file with the hlir16 package imported from the checkout, and returns its results."""
+    checkout = os.path.abspath(os.path.expanduser(checkout))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.symlink(checkout, os.path.join(tmpdir, 'hlir16'))
+        output = os.path.join(tmpdir, 'results.json')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmpdir, checkout]))
+        cmd = [sys.executable, os.path.abspath(__file__), '--fixture', fixture, '--repeat', f'{repeat}', '--output', output]
+        for sel in selected or []:
+            cmd += ['--only', sel]
+        subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(output, 'r') as results_in:
+            return json.load(results_in)
+
+
+def print_table(columns):
+    """columns: list of (title, results); the ratio to the first column is shown for the others."""
+    names = list(dict.fromkeys(name for _, results in columns for name in results))
+    print(f"{'ns/op':25}" + ''.join(f'{title[-24:]:>26}' for title, _ in columns))
+    for name in names:
+        base = columns[0][1].get(name)
+        cells = []
+        for idx, (_, results) in enumerate(columns):
+            if (value := results.get(name)) is None:
+                cells.append(f"{'-':>26}")
+            elif idx == 0 or base is None:
+                cells.append(f'{value:26.1f}')
+            else:
+                cells.append(f'{value:17.1f} ({value / base:5.2f}x)')
+        print(f'{name:25}' + ''.join(cells))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Microbenchmarks for the core P4Node operations')
+    parser.add_argument('--fixture', default=default_fixture, help='The program (p4test JSON) whose HLIR the operations run on')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timing rounds (the best one is kept)')
+    parser.add_argument('--only', action='append', help='Runs only the benchmarks whose name contains this')
+    parser.add_argument('--output', metavar='FILE', help='Saves the results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Shows the results next to saved results')
+    parser.add_argument('--checkout', action='append', metavar='DIR', help='Runs the benchmarks on the package in this directory (can be repeated)')
+    args = parser.parse_args(args)
+
+    fixture = os.path.abspath(args.fixture)
+    if args.checkout:
+        columns = [(checkout, run_in_checkout(checkout, fixture, args.repeat, args.only)) for checkout in args.checkout]
+    else:
+        columns = [('current', run_benchmarks(fixture, args.repeat, args.only))]
+
+    if args.output:
+        with open(args.output, 'w') as results_out:
+            json.dump(columns[-1][1], results_out, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline_in:
+            columns.insert(0, (args.baseline, json.load(baseline_in)))
+
+    print_table(columns)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 bench_scaling.py
+#         PYTHONPATH=.. python3 bench_scaling.py --vary controls tables --scales 1 2 4 --csv scaling.csv --plot scaling.png
+
+import argparse
+import csv
+import gc
+import json
+import math
+import sys
+
+from hlir16.gen_p4json import generate, default_sizes
+from hlir16.bench_corpus import load_stages, peak_memory
+
+
+default_scales = (1, 2, 4, 8)
+default_varied = ('headers', 'controls')
+
+# stages that take less time than this (in seconds) at the largest size are not judged
+min_judged_time = 0.002
+
+
+def scaled_sizes(scale, varied):
+    sizes = {size: default for size, default in default_sizes.items() if default is not None}
+    for size in varied:
+        sizes[size] *= scale
+    return sizes
+
+
+def measure(sizes, repeat):
+    """Loads a generated program repeatedly, and returns its node count, the best time of each stage and the peak memory."""
+    text = json.dumps(generate(**sizes))
+
+    stages = {}
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            times, hlir = load_stages(text, 'synthetic.p4')
+        finally:
+            gc.enable()
+        nodes = times.pop('walk_json_nodes')
+        for stage, stage_time in times.items():
+            stages[stage] = min(stage_time, stages.get(stage, stage_time))
+    stages['total'] = sum(stages.values())
+
+    return {'nodes': nodes, 'stages': stages, 'peak_memory': peak_memory(text, 'synthetic.p4')}
+
+
+def growth_exponent(sizes, values):
+    """The slope of the least squares line that fits log(value) against log(size):
+    about 1 for linear growth, 2 for quadratic growth."""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x > 0 else None
+
+
+def scaling_report(results, tolerance):
+    """Returns (stage, times, exponent, is_superlinear) for each stage, the total and the peak memory, slowest stage first."""
+    node_counts = [result['nodes'] for result in results]
+    series = {stage: [result['stages'][stage] for result in results] for stage in results[-1]['stages']}
+    series['peak_memory'] = [result['peak_memory'] for result in results]
+
+    report = []
+    for stage, values in series.items():
+        exponent = growth_exponent(node_counts, values)
+        is_judged = stage == 'peak_memory' or values[-1] >= min_judged_time
+        report.append((stage, values, exponent, is_judged and exponent is not None and exponent > 1 + tolerance))
+    return sorted(report, key=lambda item: (item[0] != 'total', item[0] != 'peak_memory', -item[1][-1]))
+
+
+def print_report(results, report, top):
+    print(f"{'nodes':45}" + ''.join(f"{result['nodes']:>10}" for result in results) + f"{'exponent':>10}")
+    for stage, values, exponent, is_superlinear in report[:top]:
+        value_txts = [f'{value / 2**20:9.1f}M' if stage == 'peak_memory' else f'{value:9.4f}s' for value in values]
+        exponent_txt = f'{exponent:10.2f}' if exponent is not None else f"{'-':>10}"
+        print(f"{stage:45}{''.join(value_txts)}{exponent_txt}{'  super-linear' if is_superlinear else ''}")
+
+
+def save_csv(results, report, filename):
+    with open(filename, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(['stage', 'exponent', 'is_superlinear'] + [result['nodes'] for result in results])
+        for stage, values, exponent, is_superlinear in report:
+            writer.writerow([stage, exponent, is_superlinear] + values)
+
+
+def save_plot(results, report, filename, top):
+    """Plots the time of the slowest stages and the peak memory against the node count on log-log axes; needs matplotlib."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    node_counts = [result['nodes'] for result in results]
+    fig, (time_ax, memory_ax) = plt.subplots(1, 2, figsize=(14, 6))
+    for stage, values, exponent, is_superlinear in report[:top]:
+        if stage != 'peak_memory':
+            time_ax.loglog(node_counts, values, marker='o', linestyle='--' if is_superlinear else '-', label=stage if exponent is None else f'{stage} ({exponent:.2f})')
+    time_ax.set_xlabel('nodes')
+    time_ax.set_ylabel('time (s)')
+    time_ax.legend(fontsize='small')
+
+    memory_ax.loglog(node_counts, [result['peak_memory'] / 2**20 for result in results], marker='o')
+    memory_ax.set_xlabel('nodes')
+    memory_ax.set_ylabel('peak memory (MiB)')
+
+    fig.tight_layout()
+    fig.savefig(filename)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Measures how the loading stages scale with the size of generated programs')
+    parser.add_argument('--vary', nargs='+', default=list(default_varied), choices=[size for size, default in default_sizes.items() if default is not None],
+                        help=f"The size parameters that are multiplied by the scales (default: {' '.join(default_varied)})")
+    parser.add_argument('--scales', nargs='+', type=int, default=list(default_scales))
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs per size (the best time of each stage is kept)')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='A stage is super-linear if its exponent is above 1 + tolerance')
+    parser.add_argument('--top', type=int, default=15, help='Number of stages shown')
+    parser.add_argument('--csv', metavar='FILE', help='Saves all stages as CSV')
+    parser.add_argument('--plot', metavar='FILE', help='Saves a plot (needs matplotlib)')
+    args = parser.parse_args(args)
+
+    results = []
+    for scale in sorted(args.scales):
+        results.append(result := measure(scaled_sizes(scale, args.vary), args.repeat))
+        print(f"scale {scale}: {result['nodes']} nodes, {result['stages']['total']:.3f}s", file=sys.stderr)
+
+    report = scaling_report(results, args.tolerance)
+    print_report(results, report, args.top)
+    if args.csv:
+        save_csv(results, report, args.csv)
+    if args.plot:
+        try:
+            save_plot(results, report, args.plot, args.top)
+        except ImportError:
+            print('matplotlib is not installed, the plot is not saved', file=sys.stderr)
+
+    superlinear = [stage for stage, _, _, is_superlinear in report if is_superlinear]
+    if superlinear != []:
+        print(f"super-linear: {', '.join(superlinear)}")
+    return 1 if superlinear != [] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
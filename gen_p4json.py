@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 gen_p4json.py --controls 20 --tables 30 -o big.json.gz
+
+"""Generates synthetic, p4test-shaped JSON for a v1model program of configurable size."""
+
+import argparse
+import gzip
+import json
+import sys
+
+
+class JsonBuilder(object):
+    def __init__(self):
+        self.next_id = 1
+
+    def node(self, node_type, **attrs):
+        node = {'Node_ID': self.next_id, 'Node_Type': node_type}
+        self.next_id += 1
+        node.update(attrs)
+        return node
+
+    def vec(self, elems, vec_type='Vector<Node>'):
+        node = {'Node_ID': self.next_id, 'Node_Type': vec_type, 'vec': list(elems)}
+        self.next_id += 1
+        return node
+
+    def annots(self, name=None):
+        annots = []
+        if name is not None:
+            annots.append(self.node('Annotation', name='name', expr=self.vec([self.node('StringLiteral', value=name)], 'Vector<Expression>')))
+        return self.node('Annotations', annotations=self.vec(annots, 'Vector<Annotation>'))
+
+    def path(self, name, absolute=False):
+        return self.node('Path', name=name, absolute=absolute)
+
+    def type_name(self, name):
+        return self.node('Type_Name', path=self.path(name))
+
+    def bits(self, size, signed=False):
+        return self.node('Type_Bits', size=size, isSigned=signed)
+
+    def typepars(self, names=()):
+        return self.node('TypeParameters', parameters=self.vec([self.node('Type_Var', name=name, declid=0) for name in names], 'IndexedVector<Type_Var>'))
+
+    def param(self, name, type, direction=''):
+        return self.node('Parameter', name=name, declid=0, annotations=self.annots(), direction=direction, type=type)
+
+    def params(self, params):
+        return self.node('ParameterList', parameters=self.vec(params, 'IndexedVector<Parameter>'))
+
+    def type_method(self, params, return_type=None, typepars=()):
+        return self.node('Type_Method', typeParameters=self.typepars(typepars), parameters=self.params(params), returnType=return_type or self.node('Type_Void'))
+
+    def field(self, name, type):
+        return self.node('StructField', name=name, declid=0, annotations=self.annots(), type=type)
+
+    def struct(self, node_type, name, fields):
+        return self.node(node_type, name=name, declid=0, annotations=self.annots(), typeParameters=self.typepars(), fields=self.vec(fields, 'IndexedVector<StructField>'))
+
+    def members(self, node_type, name, member_names):
+        return self.node(node_type, name=name, declid=0, members=self.vec([self.node('Declaration_ID', name=m, declid=0) for m in member_names], 'IndexedVector<Declaration_ID>'))
+
+    def const(self, value, size=32):
+        return self.node('Constant', value=value, base=10, type=self.bits(size))
+
+    def pathexpr(self, name, type):
+        return self.node('PathExpression', path=self.path(name), type=type)
+
+    def member(self, expr, member, type):
+        return self.node('Member', expr=expr, member=member, type=type)
+
+    def arg(self, expr):
+        return self.node('Argument', expression=expr)
+
+    def mcall(self, method, args=(), type_args=()):
+        return self.node('MethodCallExpression', method=method, typeArguments=self.vec(type_args, 'Vector<Type>'), arguments=self.vec([self.arg(a) for a in args], 'Vector<Argument>'), type=self.node('Type_Void'))
+
+    def mcall_stmt(self, method, args=(), type_args=()):
+        return self.node('MethodCallStatement', methodCall=self.mcall(method, args, type_args))
+
+    def block(self, components):
+        return self.node('BlockStatement', annotations=self.annots(), components=self.vec(components, 'IndexedVector<StatOrDecl>'))
+
+
+# the size parameters of generate and their defaults
+default_sizes = {
+    'headers': 4,
+    'fields': 6,
+    'header_stacks': 1,
+    'parser_states': None,
+    'controls': 2,
+    'tables': 4,
+    'keys': 2,
+    'actions': 3,
+    'registers': 1,
+    'counters': 1,
+}
+
+
+def generate(headers=4, fields=6, header_stacks=1, parser_states=None, controls=2, tables=4, keys=2, actions=3, registers=1, counters=1, field_size=16):
+    """Returns the JSON tree (as a dict) of a synthetic v1model program.
+    There are the given number of header types (with the given number of fields each) and header stacks;
+    the parser has a state for each header by default. Each control has the given number of tables (each with the given number of keys),
+    actions, registers and counters; every table lists all actions of its control.
+    The result can be loaded by walk_json_from_top and set_additional_attrs as the output of p4test."""
+    b = JsonBuilder()
+    objects = []
+
+    error_t = b.members('Type_Error', 'error', ['NoError', 'PacketTooShort', 'NoMatch', 'StackOutOfBounds'])
+    matchkinds = b.members('Declaration_MatchKind', None, ['exact', 'ternary', 'lpm'])
+    del matchkinds['name']
+    countertype_t = b.members('Type_Enum', 'CounterType', ['packets', 'bytes', 'packets_and_bytes'])
+    objects += [error_t, matchkinds, countertype_t]
+
+    packet_in_t = b.node('Type_Extern', name='packet_in', declid=0, annotations=b.annots(), typeParameters=b.typepars())
+    packet_in_t['methods'] = b.vec([b.node('Method', name='extract', declid=0, annotations=b.annots(),
+                                           type=b.type_method([b.param('hdr', b.node('Type_Var', name='T', declid=0), 'out')], typepars=['T']))], 'Vector<Method>')
+    packet_out_t = b.node('Type_Extern', name='packet_out', declid=0, annotations=b.annots(), typeParameters=b.typepars())
+    packet_out_t['methods'] = b.vec([b.node('Method', name='emit', declid=0, annotations=b.annots(),
+                                            type=b.type_method([b.param('hdr', b.node('Type_Var', name='T', declid=0), 'in')], typepars=['T']))], 'Vector<Method>')
+
+    counter_t = b.node('Type_Extern', name='counter', declid=0, annotations=b.annots(), typeParameters=b.typepars())
+    counter_t['methods'] = b.vec([
+        b.node('Method', name='counter', declid=0, annotations=b.annots(), type=b.type_method([b.param('size', b.bits(32)), b.param('type', b.type_name('CounterType'))])),
+        b.node('Method', name='count', declid=0, annotations=b.annots(), type=b.type_method([b.param('index', b.bits(32), 'in')])),
+    ], 'Vector<Method>')
+
+    register_t = b.node('Type_Extern', name='register', declid=0, annotations=b.annots(), typeParameters=b.typepars(['T']))
+    register_t['methods'] = b.vec([
+        b.node('Method', name='register', declid=0, annotations=b.annots(), type=b.type_method([b.param('size', b.bits(32))])),
+        b.node('Method', name='read', declid=0, annotations=b.annots(), type=b.type_method([b.param('result', b.type_name('T'), 'out'), b.param('index', b.bits(32), 'in')])),
+        b.node('Method', name='write', declid=0, annotations=b.annots(), type=b.type_method([b.param('index', b.bits(32), 'in'), b.param('value', b.type_name('T'), 'in')])),
+    ], 'Vector<Method>')
+    objects += [packet_in_t, packet_out_t, counter_t, register_t]
+
+    mark_to_drop_type = b.type_method([b.param('standard_metadata', b.type_name('standard_metadata_t'), 'inout')])
+    objects.append(b.node('Method', name='mark_to_drop', declid=0, annotations=b.annots(), type=mark_to_drop_type))
+
+    # headers
+    ethernet_t = b.struct('Type_Header', 'ethernet_t', [b.field('dstAddr', b.bits(48)), b.field('srcAddr', b.bits(48)), b.field('etherType', b.bits(16))])
+    hdr_types = [ethernet_t]
+    for h in range(headers):
+        hdr_types.append(b.struct('Type_Header', f'h{h}_t', [b.field(f'f{h}_{f}', b.bits(field_size if f != 0 else 16)) for f in range(fields)]))
+    stack_types = [b.struct('Type_Header', f'stk{s}_t', [b.field(f'sf{s}_{f}', b.bits(8)) for f in range(2)]) for s in range(header_stacks)]
+    objects += hdr_types + stack_types
+
+    hdr_fields = [b.field('ethernet', b.type_name('ethernet_t'))]
+    hdr_fields += [b.field(f'h{h}', b.type_name(f'h{h}_t')) for h in range(headers)]
+    hdr_fields += [b.field(f'stk{s}', b.node('Type_Stack', elementType=b.type_name(f'stk{s}_t'), size=b.const(2))) for s in range(header_stacks)]
+    headers_t = b.struct('Type_Struct', 'headers_t', hdr_fields)
+
+    meta_names = [f'meta_{m}' for m in range(max(1, registers))]
+    metadata_t = b.struct('Type_Struct', 'metadata', [b.field(name, b.bits(32)) for name in meta_names])
+    std_meta_t = b.struct('Type_Struct', 'standard_metadata_t', [b.field('ingress_port', b.bits(9)), b.field('egress_spec', b.bits(9)), b.field('packet_length', b.bits(32))])
+    objects += [headers_t, metadata_t, std_meta_t]
+
+    def hdr_pe():
+        return b.pathexpr('hdr', headers_t)
+
+    def hdr_member(h):
+        return b.member(hdr_pe(), h['name'].replace('_t', ''), h)
+
+    def fld_member(h, fld):
+        return b.member(hdr_member(h), fld['name'], fld['type'])
+
+    def meta_member(name):
+        return b.member(b.pathexpr('meta', metadata_t), name, metadata_t['fields']['vec'][meta_names.index(name)]['type'])
+
+    def std_member(name):
+        fld = next(f for f in std_meta_t['fields']['vec'] if f['name'] == name)
+        return b.member(b.pathexpr('standard_metadata', std_meta_t), name, fld['type'])
+
+    def apply_params(first_name, first_type, hdr_dir):
+        return b.params([
+            b.param(first_name, b.type_name(first_type)),
+            b.param('hdr', b.type_name('headers_t'), hdr_dir),
+            b.param('meta', b.type_name('metadata'), 'inout'),
+            b.param('standard_metadata', b.type_name('standard_metadata_t'), 'inout'),
+        ])
+
+    # parser
+    parser_type = b.node('Type_Parser', name='MyParser', declid=0, annotations=b.annots(), typeParameters=b.typepars(), applyParams=apply_params('packet', 'packet_in', 'out'))
+    state_count = parser_states if parser_states is not None else len(hdr_types)
+    state_hdrs = [hdr_types[idx % len(hdr_types)] for idx in range(state_count)]
+    state_names = ['start'] + [f'parse_{idx}' for idx in range(1, state_count)]
+
+    def extract(h):
+        method = b.member(b.pathexpr('packet', packet_in_t), 'extract', b.type_method([b.param('hdr', h, 'out')]))
+        return b.mcall_stmt(method, [hdr_member(h)], [h])
+
+    def transition(idx):
+        if idx + 1 >= state_count:
+            return b.pathexpr('accept', b.node('Type_State'))
+        h = state_hdrs[idx]
+        select_fld = h['fields']['vec'][-1] if h is ethernet_t else h['fields']['vec'][0]
+        cases = [
+            b.node('SelectCase', keyset=b.const(0x800 + idx, 16), state=b.pathexpr(state_names[idx + 1], b.node('Type_State'))),
+            b.node('SelectCase', keyset=b.node('DefaultExpression', type=b.node('Type_Dontcare')), state=b.pathexpr('accept', b.node('Type_State'))),
+        ]
+        select = b.node('ListExpression', components=b.vec([fld_member(h, select_fld)], 'Vector<Expression>'))
+        return b.node('SelectExpression', select=select, selectCases=b.vec(cases, 'Vector<SelectCase>'))
+
+    states = [b.node('ParserState', name=name, declid=0, annotations=b.annots(), components=b.vec([extract(state_hdrs[idx])], 'IndexedVector<StatOrDecl>'), selectExpression=transition(idx))
+              for idx, name in enumerate(state_names)]
+    states += [b.node('ParserState', name=name, declid=0, annotations=b.annots(), components=b.vec([], 'IndexedVector<StatOrDecl>')) for name in ('accept', 'reject')]
+    parser = b.node('P4Parser', name='MyParser', declid=0, type=parser_type, constructorParams=b.params([]),
+                    parserLocals=b.vec([], 'IndexedVector<Declaration>'), states=b.vec(states, 'IndexedVector<ParserState>'))
+    objects.append(parser)
+
+    # controls
+    ctl_types = []
+    for c in range(controls):
+        ctl_name = f'MyControl{c}'
+        ctl_type = b.node('Type_Control', name=ctl_name, declid=0, annotations=b.annots(), typeParameters=b.typepars(), applyParams=apply_params('dummy', 'packet_in', 'inout'))
+        ctl_types.append(ctl_type)
+
+        locals = []
+        regs = []
+        for r in range(registers):
+            reg = b.node('Declaration_Instance', name=f'reg{c}_{r}', declid=0, annotations=b.annots(f'{ctl_name}.reg{c}_{r}'),
+                         type=b.node('Type_Specialized', baseType=b.type_name('register'), arguments=b.vec([b.bits(32)], 'Vector<Type>')),
+                         arguments=b.vec([b.arg(b.const(1024))], 'Vector<Argument>'))
+            spcan = b.node('Type_SpecializedCanonical', baseType=register_t, arguments=b.vec([b.bits(32)], 'Vector<Type>'), substituted=register_t)
+            regs.append((reg, spcan))
+            locals.append(reg)
+        ctrs = []
+        for n in range(counters):
+            ctype_expr = b.node('TypeNameExpression', typeName=b.type_name('CounterType'), type=b.node('Type_Type', type=countertype_t))
+            ctr = b.node('Declaration_Instance', name=f'ctr{c}_{n}', declid=0, annotations=b.annots(f'{ctl_name}.ctr{c}_{n}'), type=b.type_name('counter'),
+                         arguments=b.vec([b.arg(b.const(1024)), b.arg(b.node('Member', expr=ctype_expr, member='packets', type=countertype_t))], 'Vector<Argument>'))
+            ctrs.append(ctr)
+            locals.append(ctr)
+
+        acts = []
+        for a in range(actions):
+            port_par = b.param('port', b.bits(9))
+            body = [
+                b.node('AssignmentStatement', left=std_member('egress_spec'), right=b.pathexpr('port', b.bits(9))),
+            ]
+            h = hdr_types[a % len(hdr_types)]
+            f0, f1 = h['fields']['vec'][0], h['fields']['vec'][1]
+            body.append(b.node('AssignmentStatement', left=fld_member(h, f0), right=fld_member(h, f1)))
+            if a == 0:
+                body.append(b.mcall_stmt(b.pathexpr('mark_to_drop', mark_to_drop_type), [b.pathexpr('standard_metadata', std_meta_t)]))
+            if a < len(ctrs):
+                method = b.member(b.pathexpr(ctrs[a]['name'], counter_t), 'count', b.type_method([b.param('index', b.bits(32), 'in')]))
+                body.append(b.mcall_stmt(method, [b.const(a)]))
+            if a < len(regs):
+                reg, spcan = regs[a]
+                method = b.member(b.pathexpr(reg['name'], spcan), 'read', b.type_method([b.param('result', b.bits(32), 'out'), b.param('index', b.bits(32), 'in')]))
+                body.append(b.mcall_stmt(method, [meta_member(meta_names[a % len(meta_names)]), b.const(0)]))
+            act = b.node('P4Action', name=f'act{c}_{a}', declid=0, annotations=b.annots(f'{ctl_name}.act{c}_{a}'), parameters=b.params([port_par]), body=b.block(body))
+            acts.append(act)
+        locals += acts
+
+        def action_call(act, args=()):
+            act_type = b.node('Type_Action', typeParameters=b.typepars(), parameters=b.params([]), returnType=b.node('Type_Void'))
+            return b.mcall(b.pathexpr(act['name'], act_type), args)
+
+        tbls = []
+        for t in range(tables):
+            key_elems = []
+            for k in range(keys):
+                h = hdr_types[(t + k) % len(hdr_types)]
+                fld = h['fields']['vec'][k % len(h['fields']['vec'])]
+                key_expr = fld_member(h, fld) if k % 3 != 2 else meta_member(meta_names[0])
+                match_kind = ['exact', 'ternary', 'lpm'][k % 3] if k % 3 != 2 else 'exact'
+                key_elems.append(b.node('KeyElement', annotations=b.annots(), expression=key_expr, matchType=b.pathexpr(match_kind, b.node('Type_MatchKind'))))
+            props = [
+                b.node('Property', name='key', annotations=b.annots(), isConstant=False, value=b.node('Key', keyElements=b.vec(key_elems, 'Vector<KeyElement>'))),
+                b.node('Property', name='actions', annotations=b.annots(), isConstant=False,
+                       value=b.node('ActionList', actionList=b.vec([b.node('ActionListElement', annotations=b.annots(), expression=action_call(act)) for act in acts], 'IndexedVector<ActionListElement>'))),
+                b.node('Property', name='size', annotations=b.annots(), isConstant=True, value=b.node('ExpressionValue', expression=b.const(1024))),
+                b.node('Property', name='default_action', annotations=b.annots(), isConstant=False, value=b.node('ExpressionValue', expression=action_call(acts[0], [b.const(0, 9)]))),
+            ]
+            tbl = b.node('P4Table', name=f'tbl{c}_{t}', declid=0, annotations=b.annots(f'{ctl_name}.tbl{c}_{t}'),
+                         properties=b.node('TableProperties', properties=b.vec(props, 'IndexedVector<Property>')))
+            tbls.append(tbl)
+        locals += tbls
+
+        def apply(tbl):
+            table_type = b.node('Type_Table', table=tbl)
+            return b.mcall_stmt(b.member(b.pathexpr(tbl['name'], table_type), 'apply', b.type_method([])))
+
+        components = []
+        for idx, tbl in enumerate(tbls):
+            h = hdr_types[idx % len(hdr_types)]
+            is_valid = b.mcall(b.member(hdr_member(h), 'isValid', b.type_method([], b.node('Type_Boolean'))))
+            components.append(b.node('IfStatement', condition=is_valid, ifTrue=b.block([apply(tbl)])))
+
+        control = b.node('P4Control', name=ctl_name, declid=0, type=ctl_type, constructorParams=b.params([]),
+                         controlLocals=b.vec(locals, 'IndexedVector<Declaration>'), body=b.block(components))
+        objects.append(control)
+
+    # deparser
+    deparser_type = b.node('Type_Control', name='MyDeparser', declid=0, annotations=b.annots(), typeParameters=b.typepars(), applyParams=apply_params('packet', 'packet_out', 'in'))
+    emits = [b.mcall_stmt(b.member(b.pathexpr('packet', packet_out_t), 'emit', b.type_method([b.param('hdr', h, 'in')])), [hdr_member(h)], [h]) for h in hdr_types]
+    deparser = b.node('P4Control', name='MyDeparser', declid=0, annotations=b.annots(), type=deparser_type, constructorParams=b.params([]),
+                      controlLocals=b.vec([], 'IndexedVector<Declaration>'), body=b.block(emits))
+    objects.append(deparser)
+
+    package_t = b.node('Type_Package', name='V1Switch', declid=0, annotations=b.annots(), typeParameters=b.typepars(), constructorParams=b.params([]))
+    objects.append(package_t)
+
+    ctor_args = [b.arg(b.node('ConstructorCallExpression', constructedType=b.type_name(t['name']), arguments=b.vec([], 'Vector<Argument>'), type=t))
+                 for t in [parser_type] + ctl_types + [deparser_type]]
+    main = b.node('Declaration_Instance', name='main', declid=0, annotations=b.annots(),
+                  type=b.node('Type_Specialized', baseType=b.type_name('V1Switch'), arguments=b.vec([], 'Vector<Type>')),
+                  arguments=b.vec(ctor_args, 'Vector<Argument>'))
+    objects.append(main)
+
+    return dedup_shared_nodes(b.node('P4Program', objects=b.vec(objects, 'Vector<Node>')))
+
+
+def dedup_shared_nodes(node, seen=None):
+    """Like p4c, a node that was already emitted only appears by its Node_ID.
+    The traversal order is the same as that of hlir.walk_json."""
+    seen = set() if seen is None else seen
+    if type(node) is list:
+        return [dedup_shared_nodes(elem, seen) for elem in node]
+    if type(node) is not dict:
+        return node
+    if node['Node_ID'] in seen:
+        return {'Node_ID': node['Node_ID']}
+    seen.add(node['Node_ID'])
+    return {key: dedup_shared_nodes(value, seen) for key, value in node.items()}
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Generates the JSON of a synthetic P4 program, as p4test --toJSON would')
+    for size, default in default_sizes.items():
+        parser.add_argument(f"--{size.replace('_', '-')}", type=int, default=default)
+    parser.add_argument('--field-size', type=int, default=16, help='Bit width of the header fields')
+    parser.add_argument('-o', '--output', help='Output file, gzipped if it ends with .gz (default: stdout)')
+    args = parser.parse_args(args)
+
+    json_root = generate(field_size=args.field_size, **{size: getattr(args, size) for size in default_sizes})
+    if args.output is None:
+        json.dump(json_root, sys.stdout)
+        return
+    with (gzip.open if args.output.endswith('.gz') else open)(args.output, 'wt') as out:
+        json.dump(json_root, out, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
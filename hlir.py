@@ -5,41 +5,123 @@
 # Copyright 2017-2020 Eotvos Lorand University, Budapest, Hungary
 
 
-import json
-import subprocess
+import contextlib
+import gc
 import os
 import os.path
-import tempfile
+import time
 
 from hlir16.p4node import P4Node
-from hlir16.hlir_attrs import set_additional_attrs
+from hlir16.hlir_columns import number_nodes
+
+
+def __getattr__(name):
+    # set_additional_attrs used to be imported here; hlir_attrs (and the extension modules) are only imported on demand
+    if name == 'set_additional_attrs':
+        from hlir16.hlir_attrs import set_additional_attrs
+        return set_additional_attrs
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def has_method(obj, method_name):
     return hasattr(obj, method_name) and callable(getattr(obj, method_name))
 
 
-def walk_json(node, fun, nodes, skip_elems=['Node_Type', 'Node_ID', 'Source_Info'], node_parent_chain=[]):
+class GcStats(object):
+    """Counts the collections of the cyclic garbage collector and their pauses (in seconds) while it is active."""
+
+    def __init__(self):
+        self.collections = 0
+        self.pause = 0.0
+        self.max_pause = 0.0
+        self.start = None
+
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.start = time.perf_counter()
+        elif self.start is not None:
+            pause = time.perf_counter() - self.start
+            self.collections += 1
+            self.pause += pause
+            self.max_pause = max(self.max_pause, pause)
+            self.start = None
+
+    def __enter__(self):
+        gc.callbacks.append(self.on_gc)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self.on_gc)
+
+
+@contextlib.contextmanager
+def bulk_build(freeze=False, suspend_gc=True):
+    """A context for creating many nodes at once.
+    As every node refers to its parents, the nodes form cycles, and the garbage collector would traverse
+    the growing graph again and again; therefore it is suspended inside the context (unless suspend_gc is False).
+    If freeze is set, the graph is collected once at the end, and all remaining objects are moved
+    to the permanent generation (see gc.freeze), so that later collections do not traverse them either.
+    Yields a dict that is filled in at the end: time, gc_collections, gc_pause and gc_max_pause
+    (the collections during the context, including the one before freezing) and frozen (the number of frozen objects)."""
+    stats = {}
+    was_enabled = gc.isenabled()
+    if suspend_gc:
+        gc.disable()
+    start = time.perf_counter()
+    with GcStats() as gc_stats:
+        try:
+            yield stats
+        finally:
+            if freeze:
+                gc.collect()
+                gc.freeze()
+            if was_enabled:
+                gc.enable()
+    stats.update({
+        'time': time.perf_counter() - start,
+        'gc_collections': gc_stats.collections,
+        'gc_pause': gc_stats.pause,
+        'gc_max_pause': gc_stats.max_pause,
+        'frozen': gc.get_freeze_count(),
+    })
+
+
+def _new_node(dct):
+    """Creates a node from a complete attribute dict, without the checks of P4Node.__init__."""
+    node = P4Node.__new__(P4Node)
+    object.__setattr__(node, '__dict__', dct)
+    return node
+
+
+def walk_json(node, fun, nodes, skip_elems=['Node_Type', 'Node_ID', 'Source_Info'], node_parent_link=None, seen_links=None):
+    """The node_parent_link is the (parent P4Node, key) pair through which the node is reached (None for the root).
+    Each distinct link of a node is recorded once in its node_parent_links; seen_links is the set of the recorded ones."""
+    seen_links = set() if seen_links is None else seen_links
     rets = []
     if type(node) is dict or type(node) is list:
         node_id = node['Node_ID']
         if node_id not in nodes:
-            nodes[node_id] = P4Node({
+            nodes[node_id] = _new_node({
                 'Node_ID': node_id,
                 'node_type': '(incomplete_json_data)',
-                'node_parents': [node_parent_chain],
+                'node_parent_links': [],
+                'vec': None,
             })
 
+        if node_parent_link is not None and (link_id := (node_id, id(node_parent_link[0]), node_parent_link[1])) not in seen_links:
+            seen_links.add(link_id)
+            nodes[node_id].node_parent_links.append(node_parent_link)
+
         if 'vec' in node.keys():
             elems = [(None, elem) for elem in node['vec']]
         else:
             elems = [(key, node[key]) for key in node.keys() if key not in skip_elems]
-        rets = [(key, walk_json(elem, fun, nodes, skip_elems, node_parent_chain + [nodes[node_id]])) for (key, elem) in elems if elem != {}]
+        rets = [(key, walk_json(elem, fun, nodes, skip_elems, (nodes[node_id], key), seen_links)) for (key, elem) in elems if elem != {}]
 
-    return fun(node, rets, nodes, skip_elems, node_parent_chain)
+    return fun(node, rets, nodes, skip_elems, node_parent_link)
 
 
-def p4node_creator(node, elems, nodes, skip_elems, node_parent_chain):
+def p4node_creator(node, elems, nodes, skip_elems, node_parent_link):
     if not isinstance(node, (dict, list)):
         # note: types: string, bool, int
         return node
@@ -50,9 +132,6 @@ def p4node_creator(node, elems, nodes, skip_elems, node_parent_chain):
     p4node.id = node_id
     p4node.json_data = node
 
-    if node_parent_chain not in p4node.node_parents:
-        p4node.node_parents += [node_parent_chain]
-
     if 'Node_Type' in node.keys():
         p4node.node_type = node['Node_Type']
         # p4node.remove_attr('incomplete_json_data')
@@ -67,10 +146,13 @@ def p4node_creator(node, elems, nodes, skip_elems, node_parent_chain):
     return nodes[node_id]
 
 
-def walk_json_from_top(node, fun=p4node_creator):
-    nodes = {}
-    hlir = walk_json(node, fun, nodes)
-    hlir.all_nodes = P4Node({'node_type': 'all_nodes'}, [nodes[idx] for idx in nodes.keys()])
+def walk_json_from_top(node, fun=p4node_creator, bulk=True):
+    """Creates the P4Nodes for the JSON of a program; with bulk set, it runs in a bulk_build context."""
+    with bulk_build(suspend_gc=bulk):
+        nodes = {}
+        hlir = walk_json(node, fun, nodes)
+        hlir.all_nodes = P4Node({'node_type': 'all_nodes'}, list(nodes.values()))
+        number_nodes(hlir)
     return hlir
 
 
@@ -101,6 +183,7 @@ def p4_to_json(p4_filename, json_filename=None, p4_version=16, p4c_path=None, op
         cmd_opts += ['-I', dir]
 
     base_cmd = f'{p4test} {p4_filename} --toJSON {json_filename} --Wdisable=unused'.split(' ')
+    import subprocess
     errcode = subprocess.call(base_cmd + cmd_opts)
 
     return json_filename if errcode == 0 else None
@@ -10,14 +10,13 @@ from hlir16.hlir_model import model_specific_infos
 from hlir16.hlir_attrs_extern import attrs_extern
 from hlir16.hlir_errors import addWarning, addError
 
-import hlir16.hlirx_annots
-import hlir16.hlirx_regroup
-import hlir16.hlirx_smem
+import hlir16.hlir_columns
 
 from hlir_utils import unique_everseen, dlog
 
 import re
 from collections import Counter
+from functools import partial
 
 
 def attrs_resolve_members(hlir):
@@ -1030,11 +1029,16 @@ def attrs_hdr_stacks(hlir):
 
 
 def default_attr_funs(p4_filename, p4_version):
+    # the extension modules are only imported when the attributes are computed
+    import hlir16.hlirx_annots
+    import hlir16.hlirx_regroup
+    import hlir16.hlirx_smem
+
     return [
         attrs_t4p4s,
 
         hlir16.hlirx_regroup.regroup_attrs,
-        lambda hlir: attrs_top_level(hlir, p4_filename, p4_version),
+        partial(attrs_top_level, p4_filename=p4_filename, p4_version=p4_version),
 
         hlir16.hlirx_annots.copy_annots,
 
@@ -1090,8 +1094,14 @@ def default_attr_funs(p4_filename, p4_version):
 
         attrs_improve_action_names,
         attrs_improve_localvar_names,
+
+        hlir16.hlir_columns.attrs_columns,
     ]
 
+def attr_fun_name(fun):
+    """The name of an attribute pass; passes with parameters are partial functions."""
+    return getattr(fun, '__name__', None) or fun.func.__name__
+
 def set_additional_attrs(hlir, p4_filename, p4_version, additional_attr_funs = None):
     for attrfun in additional_attr_funs or default_attr_funs(p4_filename, p4_version):
         attrfun(hlir)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+from array import array
+
+from hlir16.p4node import P4Node
+
+
+# the value of a column for nodes that do not have the attribute
+missing_value = -1
+
+# column name, attribute path, array typecode
+default_columns = [
+    ('size',         'size',        'q'),
+    ('offset',       'offset',      'q'),
+    ('padded_size',  'padded_size', 'q'),
+    ('is_reachable', 'is_reachable', 'b'),
+]
+
+# the columns whose values are node indices
+index_columns = ('parent_idx',)
+
+P4Node.define_common_attrs(['node_idx', 'indexed_nodes', 'columns'])
+
+
+def number_nodes(hlir):
+    """Assigns the dense indices 0..N-1 to the nodes of hlir.all_nodes.
+    The index of a node is stored in its .node_idx attribute,
+    and hlir.indexed_nodes[idx] gives back the node."""
+    hlir.indexed_nodes = list(hlir.all_nodes.vec)
+    for idx, node in enumerate(hlir.indexed_nodes):
+        node.node_idx = idx
+
+    hlir.columns = P4Node({'node_type': 'Columns'})
+
+
+def is_indexed(hlir, node):
+    """Note: some nodes (e.g. the ones in hlir_model) are shared between HLIRs."""
+    return 'node_idx' in node and (idx := node.node_idx) < len(hlir.indexed_nodes) and hlir.indexed_nodes[idx] is node
+
+
+def index_node(hlir, node):
+    """Gives an index to a node that was created after loading (e.g. by an attribute pass)."""
+    if is_indexed(hlir, node):
+        return node.node_idx
+
+    node.node_idx = len(hlir.indexed_nodes)
+    hlir.indexed_nodes.append(node)
+    for column in hlir.columns.__dict__.values():
+        if type(column) is array:
+            column.append(missing_value)
+
+    return node.node_idx
+
+
+def drop_indexed_nodes(hlir, dropped):
+    """Removes the dropped nodes (e.g. the ones that became unreachable) from hlir.indexed_nodes and from the columns.
+    The rest of the nodes keep their order, and are renumbered; the columns are replaced by new arrays,
+    and the values of index_columns are renumbered, too (an index of a dropped node becomes missing)."""
+    kept_idxs = [idx for idx, node in enumerate(hlir.indexed_nodes) if node not in dropped]
+    new_idxs = {old_idx: new_idx for new_idx, old_idx in enumerate(kept_idxs)}
+    hlir.indexed_nodes = [hlir.indexed_nodes[idx] for idx in kept_idxs]
+    for idx, node in enumerate(hlir.indexed_nodes):
+        node.node_idx = idx
+
+    for name, column in list(hlir.columns.__dict__.items()):
+        if type(column) is not array:
+            continue
+        values = (column[idx] for idx in kept_idxs)
+        if name in index_columns:
+            values = (new_idxs.get(value, missing_value) for value in values)
+        hlir.columns.set_attr(name, array(column.typecode, values))
+
+
+def add_column(hlir, name, typecode='q'):
+    """Creates a column that holds one value per indexed node, all of them missing initially."""
+    column = array(typecode, [missing_value]) * len(hlir.indexed_nodes)
+    hlir.columns.set_attr(name, column)
+    return column
+
+
+def fill_column(hlir, name, fun_or_path, typecode='q'):
+    """Creates a column with values taken from the indexed nodes.
+    Values that are not integers (or booleans) are stored as missing."""
+    column = add_column(hlir, name, typecode)
+
+    if type(path := fun_or_path) is str:
+        getval_fun = lambda node: node.get_attr(path) if '.' not in path else node(path, default=None)
+    else:
+        getval_fun = fun_or_path
+
+    for idx, node in enumerate(hlir.indexed_nodes):
+        if type(value := getval_fun(node)) in (int, bool):
+            column[idx] = value
+
+    return column
+
+
+def parent_idx(node):
+    if 'node_parent_links' not in node or node.node_parent_links == []:
+        return missing_value
+    parent = node.node_parent_links[0][0]
+    return parent.node_idx if 'node_idx' in parent else missing_value
+
+
+def get_column_value(hlir, name, node):
+    """Returns the value of the column for the node, or None if the value is missing."""
+    if not is_indexed(hlir, node):
+        return None
+    value = hlir.columns.get_attr(name)[node.node_idx]
+    return None if value == missing_value else value
+
+
+def set_column_value(hlir, name, node, value):
+    hlir.columns.get_attr(name)[index_node(hlir, node)] = value
+
+
+def nodes_where(hlir, name, cond):
+    """Returns a P4Node vector of the indexed nodes whose (non-missing) column value satisfies the condition."""
+    column = hlir.columns.get_attr(name)
+    nodes = hlir.indexed_nodes
+    return P4Node([nodes[idx] for idx, value in enumerate(column) if value != missing_value if cond(value)])
+
+
+def as_numpy(column):
+    """Returns a zero-copy NumPy view of the column; requires NumPy to be installed.
+    Note: while the view is alive, index_node cannot extend the column."""
+    import numpy as np
+    return np.frombuffer(column, dtype=np.dtype(column.typecode))
+
+
+def attrs_columns(hlir):
+    """Collects derived numeric attributes into columns.
+    Nodes created by the attribute passes are not indexed; use index_node for them."""
+    if 'columns' not in hlir:
+        number_nodes(hlir)
+
+    fill_column(hlir, 'parent_idx', parent_idx)
+    for name, path, typecode in default_columns:
+        fill_column(hlir, name, path, typecode)
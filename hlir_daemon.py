@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 hlir_daemon.py serve /tmp/hlir.sock
+#         PYTHONPATH=.. python3 hlir_daemon.py query /tmp/hlir.sock program.json controls --filter name=MyIngress --map name
+#         PYTHONPATH=.. python3 hlir_daemon.py stats /tmp/hlir.sock
+
+import argparse
+from collections import OrderedDict, deque
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+import hlir16.hlir
+from hlir16.p4node import P4Node, _xdir_names
+from hlir16.hlir_attrs import set_additional_attrs
+from hlir16.hlir_json import load_json
+
+
+# how many programs are kept in memory
+default_max_programs = 8
+
+# how many of the last request latencies are kept for the statistics
+latency_window = 1000
+
+
+def source_hash(filename, opts=(), include_dirs=()):
+    """The hash of the contents of the file and the options it is compiled with.
+    Note: the files included by the program are not hashed."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as source:
+        for chunk in iter(lambda: source.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(json.dumps([list(opts), list(include_dirs)]).encode())
+    return digest.hexdigest()
+
+
+def compact(value, depth=0):
+    """A JSON serializable representation of a query result.
+    A node is represented by its type, name and Node_ID; up to the given depth, its attributes are included, too.
+    A vector is represented by the list of its elements."""
+    if not isinstance(value, P4Node):
+        return value if type(value) in (str, int, float, bool) or value is None else repr(value)
+    if value.is_vec():
+        return [compact(elem, depth) for elem in value.vec]
+
+    result = {'node_type': value.get_attr('node_type'), 'Node_ID': value.get_attr('Node_ID')}
+    if 'name' in value:
+        result['name'] = compact(value.name)
+    if depth > 0:
+        for key in _xdir_names(value):
+            if key not in result:
+                result[key] = compact(value.get_attr(key), depth - 1)
+    return result
+
+
+def _parse_selector(selector):
+    path, sep, value = selector.partition('=')
+    if sep == '':
+        return [path]
+    try:
+        return [path, json.loads(value)]
+    except ValueError:
+        return [path, value]
+
+
+def select(node, path=None, filters=(), map_path=None):
+    """Evaluates a query on the node (usually an HLIR):
+    the path (see P4Node.__call__) is followed first, then the vector that is reached is filtered
+    by each [path] or [path, value] filter (see P4Node.filter), and finally mapped by the map path.
+    Raises ValueError if the path cannot be followed."""
+    result = node(path) if path else node
+    for selector in filters:
+        result = result.filter(*selector)
+    if map_path is not None:
+        result = result.map(map_path)
+
+    if isinstance(result, P4Node) and result.get_attr('node_type') == 'INVALID':
+        raise ValueError(f"'{result.remaining_path}' cannot be followed in '{result.original_path}'")
+    return result
+
+
+class Program(object):
+    """The last loaded version of a source file (a P4 file or the JSON output of p4test)."""
+
+    def __init__(self, filename, opts=(), include_dirs=()):
+        self.filename = filename
+        self.opts = opts
+        self.include_dirs = include_dirs
+        self.file_state = None
+        self.hash = None
+        self.loaded_hash = None
+        self.hlir = None
+
+    def current_hash(self):
+        """The hash of the source; it is recomputed only if the size or the modification time of the file has changed."""
+        stat = os.stat(self.filename)
+        if (file_state := (stat.st_mtime_ns, stat.st_size)) != self.file_state:
+            self.file_state = file_state
+            self.hash = source_hash(self.filename, self.opts, self.include_dirs)
+        return self.hash
+
+    def load(self, json_dir):
+        json_filename = self.filename
+        if not self.filename.endswith('.json'):
+            json_filename = os.path.join(json_dir, f'{self.hash}.json')
+            if not os.path.isfile(json_filename):
+                json_filename = hlir16.hlir.p4_to_json(self.filename, json_filename, opts=self.opts, p4_include_dirs=self.include_dirs)
+                if json_filename is None:
+                    raise ValueError(f'{self.filename} could not be compiled to JSON')
+        self.hlir = hlir16.hlir.walk_json_from_top(load_json(json_filename))
+        set_additional_attrs(self.hlir, self.filename, 16)
+        self.loaded_hash = self.hash
+        return self.hlir
+
+
+class HlirCache(object):
+    """Keeps the recently used programs (with their HLIRs), at most max_programs of them.
+    A program is reloaded when the hash of its source changes."""
+
+    def __init__(self, max_programs=default_max_programs, json_dir=None):
+        self.max_programs = max_programs
+        self.json_dir = json_dir or tempfile.mkdtemp(prefix='hlir_daemon_')
+        self.programs = OrderedDict()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {'requests': 0, 'errors': 0, 'hits': 0, 'misses': 0, 'reloads': 0}
+        self.latencies = deque(maxlen=latency_window)
+
+    def get(self, filename, opts=(), include_dirs=()):
+        filename = os.path.abspath(filename)
+        key = (filename, tuple(opts), tuple(include_dirs))
+        if (program := self.programs.get(key)) is None:
+            program = self.programs[key] = Program(filename, key[1], key[2])
+        self.programs.move_to_end(key)
+
+        if program.current_hash() == program.loaded_hash:
+            self.counts['hits'] += 1
+            return program.hlir
+
+        self.counts['misses'] += 1
+        if program.loaded_hash is not None:
+            self.counts['reloads'] += 1
+        try:
+            return program.load(self.json_dir)
+        finally:
+            # the evicted programs take their HLIRs with them
+            while len(self.programs) > self.max_programs:
+                self.programs.popitem(last=False)
+
+    def handle(self, request):
+        """Answers a request (a dict), see the README for the operations."""
+        op = request.get('op', 'query')
+        if op == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+
+        hlir = self.get(request['program'], request.get('opts', ()), request.get('include_dirs', ()))
+        if op == 'load':
+            return {'ok': True, 'nodes': len(hlir.all_nodes)}
+        if op == 'query':
+            result = select(hlir, request.get('path'), request.get('filter', ()), request.get('map'))
+            return {'ok': True, 'result': compact(result, request.get('depth', 0))}
+        raise ValueError(f'Unknown operation {op}')
+
+    def answer(self, line):
+        """Answers a request given as a line of JSON, and returns the response as a line of JSON."""
+        start = time.perf_counter()
+        with self.lock:
+            self.counts['requests'] += 1
+            try:
+                response = self.handle(json.loads(line))
+            except Exception as e:
+                self.counts['errors'] += 1
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.latencies.append(time.perf_counter() - start)
+        return json.dumps(response, separators=(',', ':')) + '\n'
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies != [] else None
+
+        lookups = self.counts['hits'] + self.counts['misses']
+        return dict(self.counts,
+            uptime=time.time() - self.started,
+            programs=len(self.programs),
+            hit_rate=self.counts['hits'] / lookups if lookups > 0 else None,
+            latency_p50=percentile(0.5),
+            latency_p90=percentile(0.9),
+            latency_p99=percentile(0.99),
+            latency_max=latencies[-1] if latencies != [] else None,
+        )
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() != b'':
+                self.wfile.write(self.server.cache.answer(line).encode())
+
+
+class HlirServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, cache=None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        self.cache = cache or HlirCache()
+
+
+def serve(socket_path, max_programs=default_max_programs, json_dir=None):
+    with HlirServer(socket_path, HlirCache(max_programs, json_dir)) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def request(socket_path, **fields):
+    """Sends a request to the daemon and returns its response (a dict)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(fields).encode() + b'\n')
+        with sock.makefile('rb') as response:
+            return json.loads(response.readline())
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='A local daemon that keeps HLIRs in memory and answers queries about them')
+    parser.add_argument('command', choices=['serve', 'query', 'load', 'stats'])
+    parser.add_argument('socket', help='Path of the Unix socket')
+    parser.add_argument('program', nargs='?', help='A P4 file or the output of p4test --toJSON')
+    parser.add_argument('path', nargs='?', help="A path such as 'controls' or 'news.model'")
+    parser.add_argument('--filter', action='append', default=[], help="Filters the result by PATH or PATH=VALUE, e.g. node_type=P4Control")
+    parser.add_argument('--map', help='Maps the result by the path')
+    parser.add_argument('--depth', type=int, default=0, help='How deep the attributes of the resulting nodes are shown')
+    parser.add_argument('-I', '--include', action='append', default=[], help='Include directory (for P4 files)')
+    parser.add_argument('-o', '--option', action='append', default=[], help='Preprocessor option (for P4 files)')
+    parser.add_argument('--max-programs', type=int, default=default_max_programs)
+    args = parser.parse_args(args)
+
+    if args.command == 'serve':
+        serve(args.socket, args.max_programs)
+        return 0
+
+    fields = {'op': args.command}
+    if args.command != 'stats':
+        if args.program is None:
+            parser.error('the program is missing')
+        fields.update(program=os.path.abspath(args.program), opts=args.option, include_dirs=args.include)
+    if args.command == 'query':
+        fields.update(path=args.path, filter=[_parse_selector(selector) for selector in args.filter], map=args.map, depth=args.depth)
+
+    response = request(args.socket, **fields)
+    print(json.dumps(response, indent=2))
+    return 0 if response['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+import hashlib
+
+from hlir16.p4node import P4Node
+from hlir16.hlir_hash import compute_bottom_up, _is_followed
+
+
+P4Node.define_common_attrs(['fingerprints'])
+
+
+def _target_text(node):
+    """Describes a referred node without its Node_ID."""
+    return f"{node.get_attr('node_type')}:{node.get_attr('canonical_name') or node.get_attr('name')}"
+
+
+def _value_text(value):
+    if type(value) is P4Node:
+        return _target_text(value)
+    if type(value) in (list, tuple):
+        return '[' + ','.join(_value_text(elem) for elem in value) + ']'
+    if type(value) in (set, frozenset):
+        return '{' + ','.join(sorted(_value_text(elem) for elem in value)) + '}'
+    if type(value) is dict:
+        return '{' + ','.join(f'{_value_text(key)}:{_value_text(elem)}' for key, elem in value.items()) + '}'
+    return f'{type(value).__name__}:{value!r}'
+
+
+def _fingerprint(node, links, fingerprints):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{node.get_attr('node_type')}\0{node.get_attr('name')}\0".encode())
+    for key, value in links:
+        digest.update(f'{key}\0'.encode())
+        if type(value) is not P4Node:
+            digest.update(b'v' + _value_text(value).encode())
+        elif not _is_followed(key, value):
+            digest.update(b'r' + _target_text(value).encode())
+        elif value in fingerprints:
+            digest.update(b'n' + fingerprints[value])
+        else:
+            digest.update(b'c' + _target_text(value).encode())
+        digest.update(b'\0')
+    return digest.digest()
+
+
+def fingerprints(hlir):
+    """Computes Merkle fingerprints for the nodes of the HLIR (node -> 16 byte digest) bottom-up,
+    and caches them as hlir.fingerprints.
+    A fingerprint covers the subtree of the node like structural_hashes, but it does not depend on the process:
+    references are represented by the type and name of their target, Node_IDs are not used."""
+    if 'fingerprints' not in hlir:
+        hlir.fingerprints = compute_bottom_up(hlir, _fingerprint)
+    return hlir.fingerprints
+
+
+def fingerprint(hlir, node=None):
+    """The fingerprint of the node (by default, of the whole HLIR) as a hex string."""
+    return fingerprints(hlir)[hlir if node is None else node].hex()
+
+
+def top_level_groups(hlir):
+    """The vectors under the root, e.g. hlir.controls, hlir.tables or hlir.header_instances, as a name -> vector dict."""
+    return {key: value for key, value in hlir.__dict__.items()
+            if type(value) is P4Node and value.is_vec() and key not in P4Node.common_attrs and value.node_type != 'all_nodes'}
+
+
+def _keyed_elems(vec):
+    elems = {}
+    for idx, elem in enumerate(vec.vec):
+        if type(elem) is not P4Node:
+            continue
+        key = elem.get_attr('canonical_name') or elem.get_attr('name') or f'#{idx}'
+        while key in elems:
+            key += "'"
+        elems[key] = elem
+    return elems
+
+
+def diff_hlirs(old_hlir, new_hlir):
+    """Compares two HLIRs by their fingerprints.
+    Returns the names of the added, removed and changed elements in the top level groups (see top_level_groups)
+    as a dict: group name -> {'added': [...], 'removed': [...], 'changed': [...]}; groups without changes are omitted.
+    Changed scalar attributes of the root are listed under the name '(attributes)'.
+    Unchanged subtrees are skipped by comparing their fingerprints only."""
+    old_fps = fingerprints(old_hlir)
+    new_fps = fingerprints(new_hlir)
+    if old_fps[old_hlir] == new_fps[new_hlir]:
+        return {}
+
+    changes = {}
+
+    old_groups, new_groups = top_level_groups(old_hlir), top_level_groups(new_hlir)
+    for group in sorted(old_groups.keys() | new_groups.keys()):
+        old_vec, new_vec = old_groups.get(group), new_groups.get(group)
+        if old_vec is not None and new_vec is not None and old_fps.get(old_vec) == new_fps.get(new_vec):
+            continue
+
+        old_elems = _keyed_elems(old_vec) if old_vec is not None else {}
+        new_elems = _keyed_elems(new_vec) if new_vec is not None else {}
+        group_changes = {
+            'added':   [key for key in new_elems if key not in old_elems],
+            'removed': [key for key in old_elems if key not in new_elems],
+            'changed': [key for key, elem in new_elems.items() if key in old_elems if old_fps.get(old_elems[key]) != new_fps.get(elem)],
+        }
+        if any(group_changes.values()):
+            changes[group] = group_changes
+
+    def scalar_attrs(hlir):
+        return {key: _value_text(value) for key, value in hlir.__dict__.items() if type(value) is not P4Node if key not in P4Node.common_attrs}
+    old_attrs, new_attrs = scalar_attrs(old_hlir), scalar_attrs(new_hlir)
+    if (changed_attrs := sorted(key for key in old_attrs.keys() | new_attrs.keys() if old_attrs.get(key) != new_attrs.get(key))) != []:
+        changes['(attributes)'] = {'added': [], 'removed': [], 'changed': changed_attrs}
+
+    return changes
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# Exports the indexed nodes of an HLIR (see hlir_columns.py) into NumPy arrays for bulk analytics.
+# NumPy is only required when these functions are called.
+
+import os
+import os.path
+
+from hlir16.hlir_columns import missing_value
+from hlir16.hlir_utils import is_ref_link, subnodes
+
+
+default_numeric_attrs = ('size', 'offset', 'padded_size')
+
+
+def string_table(strings):
+    """Returns the unique strings in order of appearance, and a function that gives the index of a string."""
+    ids = {}
+    for txt in strings:
+        if txt not in ids:
+            ids[txt] = len(ids)
+    return list(ids), ids.get
+
+
+def numeric_values(hlir, attrname):
+    if 'columns' in hlir and (column := hlir.columns.get_attr(attrname)) is not None:
+        return column
+    return [value if type(value := node.get_attr(attrname)) in (int, bool) else missing_value for node in hlir.indexed_nodes]
+
+
+def to_csr(np, edges, node_count, label_id):
+    """The edges are (source index, target index, label) triples, ordered by the source index."""
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    indices = np.fromiter((target for _, target, _ in edges), dtype=np.int32, count=len(edges))
+    labels = np.fromiter((label_id(label) for _, _, label in edges), dtype=np.int32, count=len(edges))
+    np.cumsum(np.bincount(np.fromiter((source for source, _, _ in edges), dtype=np.int64, count=len(edges)), minlength=node_count), out=indptr[1:])
+    return indptr, indices, labels
+
+
+def export_arrays(hlir, numeric_attrs=default_numeric_attrs):
+    """Returns a dict of NumPy arrays that describe the indexed nodes of the HLIR.
+
+    - nodes: a structured array with the fields idx, type_code, parent, name_id and the numeric attributes
+    - node_types, names, edge_labels: string tables for type_code, name_id and the edge labels
+    - child_indptr, child_indices, child_labels: CSR adjacency of the child edges
+    - ref_indptr, ref_indices, ref_labels: CSR adjacency of the reference edges (type_ref, hdr_ref etc.)
+
+    Missing values are -1. Edges to nodes that are not indexed are left out.
+    Vector elements are labelled by the empty string."""
+    import numpy as np
+
+    nodes = hlir.indexed_nodes
+    node_count = len(nodes)
+
+    node_types, type_code = string_table(node.node_type for node in nodes)
+    names, name_id = string_table(name for node in nodes if type(name := node.get_attr('name')) is str)
+
+    dtype = [('idx', np.int32), ('type_code', np.int32), ('parent', np.int32), ('name_id', np.int32)]
+    dtype += [(attrname, np.int64) for attrname in numeric_attrs]
+    arr = np.zeros(node_count, dtype=dtype)
+
+    arr['idx'] = np.arange(node_count, dtype=np.int32)
+    arr['type_code'] = np.fromiter((type_code(node.node_type) for node in nodes), dtype=np.int32, count=node_count)
+    arr['name_id'] = np.fromiter((name_id(name) if type(name := node.get_attr('name')) is str else missing_value for node in nodes), dtype=np.int32, count=node_count)
+    if 'columns' in hlir and 'parent_idx' in hlir.columns:
+        arr['parent'] = np.frombuffer(hlir.columns.parent_idx, dtype=np.int64)
+    else:
+        from hlir16.hlir_columns import parent_idx
+        arr['parent'] = np.fromiter((parent_idx(node) for node in nodes), dtype=np.int32, count=node_count)
+    for attrname in numeric_attrs:
+        arr[attrname] = np.asarray(numeric_values(hlir, attrname), dtype=np.int64)
+
+    child_edges = []
+    ref_edges = []
+    for idx, node in enumerate(nodes):
+        for key, subnode in subnodes(node):
+            if 'node_idx' not in subnode or (target := subnode.node_idx) >= node_count or nodes[target] is not subnode:
+                continue
+            label = key if type(key) is str else ''
+            (ref_edges if is_ref_link(key) else child_edges).append((idx, target, label))
+
+    edge_labels, label_id = string_table(label for _, _, label in child_edges + ref_edges)
+
+    child_indptr, child_indices, child_labels = to_csr(np, child_edges, node_count, label_id)
+    ref_indptr, ref_indices, ref_labels = to_csr(np, ref_edges, node_count, label_id)
+
+    return {
+        'nodes': arr,
+        'node_types': np.array(node_types, dtype=str),
+        'names': np.array(names, dtype=str),
+        'edge_labels': np.array(edge_labels, dtype=str),
+        'child_indptr': child_indptr,
+        'child_indices': child_indices,
+        'child_labels': child_labels,
+        'ref_indptr': ref_indptr,
+        'ref_indices': ref_indices,
+        'ref_labels': ref_labels,
+    }
+
+
+def save_arrays(arrays, dirname):
+    """Saves the exported arrays as .npy files into the directory."""
+    import numpy as np
+
+    os.makedirs(dirname, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(dirname, f'{name}.npy'), arr, allow_pickle=False)
+
+
+def load_arrays(dirname, mmap_mode='r'):
+    """Loads the arrays saved by save_arrays; by default, they are memory-mapped."""
+    import numpy as np
+
+    return {filename[:-len('.npy')]: np.load(os.path.join(dirname, filename), mmap_mode=mmap_mode, allow_pickle=False)
+            for filename in sorted(os.listdir(dirname)) if filename.endswith('.npy')}
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+from hlir16.p4node import P4Node, deep_copy, shallow_copy, _paths_new_nodes
+
+
+P4Node.define_common_attrs(['forked_from', 'incoming_links', 'cow_origin'])
+
+# attributes of the root that describe the nodes of one HLIR, a fork builds its own when needed
+per_hlir_attrs = ('text_index', 'ref_index', 'incoming_links', 'fingerprints')
+
+
+def incoming_links(hlir):
+    """Returns a dict: node -> list of (parent, key) pairs that lead to the node.
+    These are the vectors that contain the node (e.g. both control.controlLocals and hlir.tables for a table),
+    and the attribute through which the node is first found in a breadth first search from the root;
+    other attributes that point to the node (e.g. type_ref or table) are considered references.
+    It is built once and cached as hlir.incoming_links."""
+    if 'incoming_links' in hlir:
+        return hlir.incoming_links
+
+    links = {hlir: []}
+    level = [hlir]
+    while level != []:
+        next_level = []
+        for node in level:
+            for key, subnode in _paths_new_nodes(node):
+                if type(subnode) is not P4Node:
+                    continue
+                if (is_new := subnode not in links):
+                    links[subnode] = []
+                    next_level.append(subnode)
+                if is_new or type(key) is int:
+                    links[subnode].append((node, key))
+        level = next_level
+
+    hlir.incoming_links = links
+    return links
+
+
+def origin(node):
+    """The node of the original HLIR that the node is a (fork) copy of."""
+    return node.get_attr('cow_origin') or node
+
+
+def root_of(forked):
+    root = forked
+    while 'forked_from' in root:
+        root = root.forked_from
+    return root
+
+
+def fork(hlir):
+    """Returns a copy-on-write fork of the HLIR (or of another fork).
+    The fork shares all nodes with the HLIR; use writable to get a node of the fork that can be changed.
+    The HLIR should not be changed while its forks are in use, as the forks would see the changes of the shared nodes.
+    The indices of the HLIR (e.g. all_nodes, indexed_nodes and columns) are shared and refer to the original nodes."""
+    forked = deep_copy(hlir, copy_on_write=True)
+    for attr in per_hlir_attrs:
+        forked.__dict__.pop(attr, None)
+    forked.forked_from = hlir
+    forked.cow_origin = origin(hlir)
+    forked.cow_copies[origin(hlir)] = forked
+    return forked
+
+
+def _version_in(forked, orig):
+    """The version of the original node that the fork sees."""
+    while forked is not None and 'cow_copies' in forked:
+        if (copy := forked.cow_copies.get(orig)) is not None:
+            return copy
+        forked = forked.get_attr('forked_from')
+    return orig
+
+
+def _own(forked, orig, links):
+    copies = forked.cow_copies
+    if (copy := copies.get(orig)) is not None:
+        return copy
+
+    current = _version_in(forked.forked_from, orig)
+    copies[orig] = copy = shallow_copy(current)
+    copies[copy] = copy
+    copy.__dict__['is_copied'] = True
+    copy.__dict__['cow_origin'] = orig
+
+    for parent, key in links.get(orig, ()):
+        parent = _own(forked, parent, links)
+        if type(key) is not int:
+            if parent.get_attr(key) is current:
+                parent.set_attr(key, copy)
+        elif key < len(parent.vec) and parent.vec[key] is current:
+            parent.vec[key] = copy
+        elif current in parent.vec:
+            parent.vec[parent.vec.index(current)] = copy
+
+    return copy
+
+
+def writable(forked, node_or_path):
+    """Returns the fork's own version of a node, which can be changed freely.
+    The node can be given as a node of the original HLIR (or of a fork it was made from),
+    or by a path from the root (a dot separated string as in __call__, or a list of keys and indices).
+    At the first request, the node is copied, and so are the nodes that lead to it from the root;
+    the rest of the nodes remain shared.
+    Note: references (see incoming_links) that point to the node keep pointing to the original node."""
+    if type(node_or_path) is not P4Node:
+        node = forked
+        for key in node_or_path.split('.') if type(node_or_path) is str else node_or_path:
+            node = node.vec[key] if type(key) is int else getattr(node, key)
+        node_or_path = node
+
+    links = incoming_links(root_of(forked))
+    if (orig := origin(node_or_path)) not in links:
+        raise ValueError(f'Node #{node_or_path.Node_ID} is not found in the HLIR of the fork #{forked.Node_ID}')
+
+    # the node is about to be changed, the cached fingerprints of the fork (see hlir_diff) would be stale
+    forked.__dict__.pop('fingerprints', None)
+    return _own(forked, orig, links)
+
+
+def is_own(forked, node):
+    """Tells if the node belongs to the fork, i.e. it was copied for it."""
+    return forked.cow_copies.get(node) is node
+
+
+def changed_nodes(forked):
+    """The nodes that were copied for the fork (except the root), as a P4Node vector."""
+    return P4Node([node for node in forked.cow_copies if forked.cow_copies[node] is node if node is not forked])
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+import sys
+
+from hlir16.p4node import P4Node
+from hlir16.hlir_utils import is_ref_link, subnodes
+from hlir16.hlir_columns import drop_indexed_nodes
+
+
+# attributes that the attribute passes add to point to nodes elsewhere in the HLIR
+reference_attrs = {'env_node', 'enclosing_control', 'orig_hdr', 'orig_fld', 'stack', 'control', 'table', 'action_object', 'smem'}
+
+# types whose nodes are not changed after loading, and can be shared by hash_cons_types
+default_hash_consed_types = ('Type_Bits', 'Type_Varbits', 'Type_Boolean', 'Type_InfInt', 'Type_String', 'Type_Void', 'Type_Dontcare', 'Type_Name')
+
+
+def is_reference(key):
+    return is_ref_link(key) or key in reference_attrs
+
+
+def _structural_links(node):
+    if node.vec is not None:
+        return list(enumerate(node.vec)) if type(node.vec) is list else sorted(node.vec.items())
+    return sorted((key, value) for key, value in node.__dict__.items() if key not in P4Node.common_attrs)
+
+
+def _value_hash(value):
+    try:
+        return hash((type(value).__name__, value))
+    except TypeError:
+        return hash(repr(value))
+
+
+def _is_followed(key, value):
+    """Tells if the bottom-up hashing descends into the linked value."""
+    return type(value) is P4Node and not (type(key) is str and is_reference(key)) and value.get_attr('node_type') != 'all_nodes'
+
+
+def compute_bottom_up(root, node_hash, hashes=None):
+    """Computes a hash for the nodes reachable from the root bottom-up (except through references and hlir.all_nodes),
+    and returns them in a dict (node -> hash).
+    node_hash(node, links, hashes) is called after the hashes of the linked nodes are computed;
+    links are (key, value) pairs, a linked node is missing from hashes if its hash is being computed (it is on a cycle)."""
+    hashes = {} if hashes is None else hashes
+    if root in hashes:
+        return hashes
+
+    on_stack = {root}
+    stack = [[root, _structural_links(root), 0]]
+    while stack != []:
+        entry = stack[-1]
+        node, links, idx = entry
+        while idx < len(links):
+            key, value = links[idx]
+            if _is_followed(key, value) and value not in hashes and value not in on_stack:
+                break
+            idx += 1
+        entry[2] = idx
+
+        if idx < len(links):
+            subnode = links[idx][1]
+            on_stack.add(subnode)
+            stack.append([subnode, _structural_links(subnode), 0])
+            continue
+
+        hashes[node] = node_hash(node, links, hashes)
+        on_stack.discard(node)
+        stack.pop()
+
+    return hashes
+
+
+def _structural_hash(node, links, hashes):
+    parts = [node.get_attr('node_type'), node.get_attr('name')]
+    for key, value in links:
+        if type(value) is not P4Node:
+            parts.append((key, _value_hash(value)))
+        elif not _is_followed(key, value):
+            parts.append((key, 'ref', id(value)))
+        elif value in hashes:
+            parts.append((key, hashes[value]))
+        else:
+            parts.append((key, 'cycle', value.get_attr('node_type'), value.get_attr('name')))
+    return hash(tuple(parts))
+
+
+def structural_hashes(root, hashes=None):
+    """Computes a hash for the nodes reachable from the root bottom-up, and returns them in a dict (node -> hash).
+    The hash of a node depends on its type, name, noncommon attributes and vector elements, but not on its Node_ID.
+    References (see is_reference) are hashed by the identity of their target,
+    links back to a node whose hash is being computed by its type and name.
+    The hashes are only comparable within the same process."""
+    return compute_bottom_up(root, _structural_hash, hashes)
+
+
+def _same_structure(node1, node2):
+    """Compares two nodes structurally, following the same rules as structural_hashes."""
+    assumed = set()
+    todo = [(node1, node2)]
+    while todo != []:
+        n1, n2 = todo.pop()
+        if n1 is n2 or (id(n1), id(n2)) in assumed:
+            continue
+        assumed.add((id(n1), id(n2)))
+
+        if n1.get_attr('node_type') != n2.get_attr('node_type') or n1.get_attr('name') != n2.get_attr('name'):
+            return False
+        if (n1.vec is None) != (n2.vec is None):
+            return False
+
+        links1, links2 = _structural_links(n1), _structural_links(n2)
+        if len(links1) != len(links2):
+            return False
+        for (key1, value1), (key2, value2) in zip(links1, links2):
+            if key1 != key2 or (type(value1) is P4Node) != (type(value2) is P4Node):
+                return False
+            if type(value1) is not P4Node:
+                if type(value1) is not type(value2) or value1 != value2:
+                    return False
+            elif not _is_followed(key1, value1):
+                if value1 is not value2:
+                    return False
+            else:
+                todo.append((value1, value2))
+
+    return True
+
+
+def structural_equal(node1, node2, hashes=None):
+    """Tells if the two nodes have the same structure (see structural_hashes).
+    Pass the same hashes dict to several calls to reuse the computed hashes."""
+    if node1 is node2:
+        return True
+    hashes = {} if hashes is None else hashes
+    structural_hashes(node1, hashes)
+    structural_hashes(node2, hashes)
+    return hashes[node1] == hashes[node2] and _same_structure(node1, node2)
+
+
+def node_size(node):
+    """The memory used by the node object, its attribute dict and its vector (but not by the attribute values)."""
+    vec = node.vec
+    return sys.getsizeof(node) + sys.getsizeof(node.__dict__) + (sys.getsizeof(vec) if vec is not None else 0)
+
+
+def _reachable_without_all_nodes(hlir):
+    found = {hlir: None}
+    todo = [hlir]
+    while todo != []:
+        for _, subnode in subnodes(todo.pop()):
+            if subnode not in found and subnode.get_attr('node_type') != 'all_nodes':
+                found[subnode] = None
+                todo.append(subnode)
+    return found
+
+
+def hash_cons_types(hlir, node_types=default_hash_consed_types):
+    """Merges the structurally identical nodes of the given (immutable) types:
+    all links to such a node are redirected to the first one of its kind.
+    The nodes that become unreachable this way are removed from hlir.all_nodes, hlir.indexed_nodes and the columns.
+    It should be called after the attribute passes, and the merged nodes should not be changed later.
+    Returns the number of merged and removed nodes and the (approximate) memory saved in bytes."""
+    nodes_before = _reachable_without_all_nodes(hlir)
+
+    hashes = {}
+    canonicals = {}
+    replacements = {}
+    for node in nodes_before:
+        if node.get_attr('node_type') not in node_types:
+            continue
+        structural_hashes(node, hashes)
+        same_hash = canonicals.setdefault(hashes[node], [])
+        for canonical in same_hash:
+            if _same_structure(canonical, node):
+                replacements[node] = canonical
+                break
+        else:
+            same_hash.append(node)
+
+    for node in nodes_before:
+        if node in replacements:
+            continue
+        if node.vec is not None:
+            if type(node.vec) is list:
+                for idx, elem in enumerate(node.vec):
+                    if type(elem) is P4Node and elem in replacements:
+                        node.vec[idx] = replacements[elem]
+            continue
+        for key, value in list(node.__dict__.items()):
+            if type(value) is P4Node and value in replacements and key not in P4Node.common_attrs:
+                node.set_attr(key, replacements[value])
+
+    for node, canonical in replacements.items():
+        if 'node_parent_links' in node and 'node_parent_links' in canonical:
+            canonical.node_parent_links = canonical.node_parent_links + node.node_parent_links
+
+    nodes_after = _reachable_without_all_nodes(hlir)
+    removed = [node for node in nodes_before if node not in nodes_after]
+    removed_set = set(removed)
+    if 'all_nodes' in hlir:
+        hlir.all_nodes.vec = [node for node in hlir.all_nodes.vec if node not in removed_set]
+    if 'indexed_nodes' in hlir:
+        drop_indexed_nodes(hlir, removed_set)
+
+    return {
+        'merged_nodes': len(replacements),
+        'removed_nodes': len(removed),
+        'saved_bytes': sum(node_size(node) for node in removed),
+    }
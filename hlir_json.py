@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+import importlib.util
+import os
+import sys
+
+
+# the backends in the order of preference (the fastest first, as measured by bench_json.py); json is always available
+preferred_backends = ('orjson', 'simdjson', 'ujson', 'json')
+
+# the environment variable that overrides the automatic choice of the backend
+backend_env_var = 'HLIR16_JSON'
+
+# the keys whose values are not converted to Python objects by the lazy (simdjson) backend, as walk_json does not walk them
+lazy_keys = ('Source_Info',)
+
+
+def _lazy_value(value, object_type, array_type):
+    """Converts the simdjson proxies to dicts and lists, except for the values of lazy_keys,
+    which are kept as proxies: they are only parsed when they are accessed.
+    The keys are interned, as json and orjson also share the key strings."""
+    if type(value) is object_type:
+        return {sys.intern(key): elem if key in lazy_keys else _lazy_value(elem, object_type, array_type) for key, elem in value.items()}
+    if type(value) is array_type:
+        return [_lazy_value(elem, object_type, array_type) for elem in value]
+    return value
+
+
+def _loads_json(data):
+    import json
+    return json.loads(data)
+
+
+def _loads_ujson(data):
+    import ujson
+    return ujson.loads(data)
+
+
+def _loads_orjson(data):
+    import orjson
+    return orjson.loads(data)
+
+
+def _loads_simdjson(data):
+    import simdjson
+    # a new parser for each document, as the proxies of a document are only valid while its parser is not reused
+    return _lazy_value(simdjson.Parser().parse(data), simdjson.Object, simdjson.Array)
+
+
+_loaders = {
+    'json':     _loads_json,
+    'ujson':    _loads_ujson,
+    'orjson':   _loads_orjson,
+    'simdjson': _loads_simdjson,
+}
+
+
+def is_available(name):
+    """Tells if the backend is installed, without importing it."""
+    return name in _loaders and importlib.util.find_spec(name) is not None
+
+
+def available_backends():
+    return [name for name in preferred_backends if is_available(name)]
+
+
+def json_backend(name=None):
+    """The name of the backend to use: the given one, or the one in $HLIR16_JSON, or the fastest installed one.
+    Raises ValueError if the requested backend is unknown or not installed."""
+    name = name or os.environ.get(backend_env_var) or available_backends()[0]
+    if name not in _loaders:
+        raise ValueError(f"Unknown JSON backend {name}, choose from: {', '.join(preferred_backends)}")
+    if not is_available(name):
+        raise ValueError(f'JSON backend {name} is not installed')
+    return name
+
+
+def loads_json(data, backend=None):
+    """Parses the JSON text (str or bytes) with the backend (see json_backend).
+    The simdjson backend is lazy: the parts that walk_json does not use (Source_Info) are left as read-only simdjson proxies."""
+    return _loaders[json_backend(backend)](data)
+
+
+def load_json(filename, backend=None):
+    with open(filename, 'rb') as json_in:
+        return loads_json(json_in.read(), backend)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 hlir_memory.py program.json
+#         PYTHONPATH=.. python3 hlir_memory.py program.json --top 30 --strings 20
+
+import argparse
+import json
+import os
+import sys
+
+from hlir16.p4node import P4Node
+
+
+# the parts of the memory of a node type; 'node' is the node object and its attribute dict,
+# 'attrs' covers the values of the attributes that have no part of their own
+memory_parts = ('node', 'json_data', 'node_parent_links', 'vec', 'attrs')
+
+
+def _json_node(value):
+    return type(value) is dict and 'Node_ID' in value
+
+
+class MemoryReport(object):
+    """The memory held by the nodes reachable from a root node, per node type and per attribute.
+    Each object is counted once, for the first node (in breadth first order) whose attribute reaches it;
+    nodes are not counted in the values of other nodes, and the part of json_data that belongs to a subnode
+    (a dict with a Node_ID) is counted for the subnode.
+    by_type maps node types to {'count': node count, part: bytes for each memory part};
+    by_attr maps attribute names to {'count': number of nodes having it, 'bytes': bytes held by its values}."""
+
+    def __init__(self, root):
+        self.by_type = {}
+        self.by_attr = {}
+        self.node_count = 0
+        self.strings = {}
+        self.seen = set()
+
+        self.found = {root: None}
+        self.todo = [root]
+        while self.todo != []:
+            todo, self.todo = self.todo, []
+            for node in todo:
+                self.add_node(node)
+
+    def add_node(self, node):
+        dct = node.__dict__
+        node_type = dct.get('node_type', '(no node_type)')
+        if (type_stats := self.by_type.get(node_type)) is None:
+            type_stats = self.by_type[node_type] = dict.fromkeys(('count',) + memory_parts, 0)
+        self.node_count += 1
+        type_stats['count'] += 1
+        type_stats['node'] += sys.getsizeof(node) + sys.getsizeof(dct)
+
+        for key, value in dct.items():
+            size = self.deep_size(value)
+            type_stats[key if key in memory_parts else 'attrs'] += size
+            if (attr_stats := self.by_attr.get(key)) is None:
+                attr_stats = self.by_attr[key] = {'count': 0, 'bytes': 0}
+            attr_stats['count'] += 1
+            attr_stats['bytes'] += size
+
+    def deep_size(self, value):
+        """The bytes held by the value that are not counted yet; nodes found in it are queued.
+        Only the built-in containers are followed: objects of other types (e.g. functions) are counted without their contents."""
+        total = 0
+        todo = [value]
+        while todo != []:
+            obj = todo.pop()
+            if isinstance(obj, P4Node):
+                if obj not in self.found:
+                    self.found[obj] = None
+                    self.todo.append(obj)
+                continue
+            if id(obj) in self.seen or (obj is not value and _json_node(obj)):
+                continue
+            self.seen.add(id(obj))
+            total += (size := sys.getsizeof(obj))
+
+            if type(obj) is str:
+                self.strings.setdefault(obj, {})[id(obj)] = size
+            elif type(obj) is dict:
+                todo.extend(obj.keys())
+                todo.extend(obj.values())
+            elif type(obj) in (list, tuple, set, frozenset):
+                todo.extend(obj)
+        return total
+
+    @property
+    def total(self):
+        return sum(stats[part] for stats in self.by_type.values() for part in memory_parts)
+
+    def part_total(self, part):
+        return sum(stats[part] for stats in self.by_type.values())
+
+    def duplicated_strings(self, top=None):
+        """(string, number of copies, bytes that deduplication would save) triples, most wasteful first."""
+        dups = [(txt, len(copies), sum(copies.values()) - max(copies.values())) for txt, copies in self.strings.items() if len(copies) > 1]
+        return sorted(dups, key=lambda dup: -dup[2])[:top]
+
+
+def memory_report(root):
+    """Collects the memory held by the nodes reachable from the root, see MemoryReport."""
+    return MemoryReport(root)
+
+
+def json_memory(json_root):
+    """The bytes held by the parsed JSON (the result of json.load), counting each object once."""
+    seen = set()
+    total = 0
+    todo = [json_root]
+    while todo != []:
+        obj = todo.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if type(obj) is dict:
+            todo.extend(obj.keys())
+            todo.extend(obj.values())
+        elif type(obj) is list:
+            todo.extend(obj)
+    return total
+
+
+def _mib(size):
+    return f'{size / 2**20:16.2f}M'
+
+
+def print_report(report, raw_json_bytes=None, file_bytes=None, top=25, top_strings=10):
+    print(f'{report.node_count} nodes hold {_mib(report.total).strip()}: '
+          + ', '.join(f'{part} {_mib(report.part_total(part)).strip()}' for part in memory_parts))
+    if raw_json_bytes is not None:
+        print(f'the parsed JSON alone holds {_mib(raw_json_bytes).strip()} (the HLIR is {report.total / raw_json_bytes:.2f}x as large)'
+              + (f', the JSON file is {_mib(file_bytes).strip()}' if file_bytes is not None else ''))
+
+    print()
+    print(f"{'node type':35} {'count':>8}" + ''.join(f'{part:>18}' for part in memory_parts) + f"{'total':>18}")
+    by_type = sorted(report.by_type.items(), key=lambda item: -sum(item[1][part] for part in memory_parts))
+    for node_type, stats in by_type[:top]:
+        print(f"{node_type[:35]:35} {stats['count']:8}" + ''.join(f' {_mib(stats[part])}' for part in memory_parts)
+              + f' {_mib(sum(stats[part] for part in memory_parts))}')
+
+    print()
+    print(f"{'attribute':35} {'count':>8} {'bytes':>10}")
+    for key, stats in sorted(report.by_attr.items(), key=lambda item: -item[1]['bytes'])[:top]:
+        print(f"{key[:35]:35} {stats['count']:8} {_mib(stats['bytes'])}")
+
+    dups = report.duplicated_strings()
+    print()
+    print(f'{len(dups)} strings have more than one copy, deduplication would save {_mib(sum(saved for _, _, saved in dups)).strip()}')
+    for txt, copies, saved in dups[:top_strings]:
+        print(f'    {copies:7} copies {saved:10} bytes  {txt[:60]!r}')
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Reports the memory held by the HLIR of a program per node type and per attribute')
+    parser.add_argument('json_file', help='The output of p4test --toJSON')
+    parser.add_argument('--top', type=int, default=25, help='Number of node types and attributes shown')
+    parser.add_argument('--strings', type=int, default=10, help='Number of duplicated strings shown')
+    parser.add_argument('--no-attrs', action='store_true', help='Measures the HLIR before the attribute passes')
+    args = parser.parse_args(args)
+
+    import hlir16.hlir
+    from hlir16.hlir_attrs import set_additional_attrs
+
+    with open(args.json_file, 'r') as json_in:
+        raw_json_bytes = json_memory(json.load(json_in))
+    with open(args.json_file, 'r') as json_in:
+        hlir = hlir16.hlir.walk_json_from_top(json.load(json_in))
+    if not args.no_attrs:
+        set_additional_attrs(hlir, args.json_file, 16)
+
+    print_report(memory_report(hlir), raw_json_bytes, os.path.getsize(args.json_file), args.top, args.strings)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
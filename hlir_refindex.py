@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+from collections import defaultdict
+
+from hlir16.p4node import P4Node, observe, unobserve
+from hlir16.hlir_utils import is_ref_link, reachable_nodes, subnodes
+
+
+P4Node.define_common_attrs(['ref_index'])
+
+
+# hlir.all_nodes lists every loaded node, also the ones that are no longer part of the program
+detached_node_types = ('all_nodes',)
+
+
+class RefIndex(object):
+    """A reverse index of the reference links (type_ref, hdr_ref, decl_ref etc., see is_ref_link).
+    For each target node, it knows the nodes that refer to it, and via which link.
+    While attached to its root, the index follows the changes that are made by set_attr and del_attr (see p4node.observe).
+    The nodes that a change cuts off from the root are dropped from the index when it is queried next,
+    and they are indexed again if set_attr links them back."""
+
+    def __init__(self):
+        # target node -> ordered set of (referrer node, link name) pairs
+        self.refs = defaultdict(dict)
+        self.root = None
+        # nodes that were replaced or deleted by set_attr/del_attr, and may have been cut off from the root
+        self.maybe_detached = []
+
+    def add(self, node, link, target):
+        if type(target) is P4Node:
+            self.refs[target][(node, link)] = None
+
+    def remove(self, node, link, target):
+        if type(target) is P4Node and (referrers := self.refs.get(target)) is not None:
+            referrers.pop((node, link), None)
+            if len(referrers) == 0:
+                del self.refs[target]
+
+    def add_node(self, node):
+        for key, value in node.__dict__.items():
+            if is_ref_link(key):
+                self.add(node, key, value)
+
+    def remove_node(self, node):
+        for key, value in node.__dict__.items():
+            if is_ref_link(key):
+                self.remove(node, key, value)
+
+    def on_change(self, node, key, old_value, new_value):
+        if is_ref_link(key):
+            self.remove(node, key, old_value)
+            self.add(node, key, new_value)
+        elif type(old_value) is P4Node and old_value is not new_value:
+            self.maybe_detached.append(old_value)
+
+    def on_new_nodes(self, nodes):
+        for node in nodes:
+            self.add_node(node)
+
+    def attach(self, root):
+        self.root = root
+        observe(root, self)
+
+    def detach(self):
+        if self.root is not None:
+            self.drop_detached()
+            unobserve(self.root, self)
+            self.root = None
+
+    def drop_detached(self):
+        """Removes the links of the nodes that are no longer reachable from the root.
+        These nodes stop notifying the observers, so if set_attr links them back, they are indexed again."""
+        if self.maybe_detached == []:
+            return
+        attached = {id(node) for node in reachable_nodes(self.root, detached_node_types)}
+        todo, self.maybe_detached = self.maybe_detached, []
+        seen = set()
+        while todo != []:
+            node = todo.pop()
+            if id(node) in attached or id(node) in seen:
+                continue
+            seen.add(id(node))
+            self.remove_node(node)
+            node.__dict__.pop('attr_observers', None)
+            todo.extend(subnode for _, subnode in subnodes(node))
+
+    def links(self, target, link=None):
+        """Returns the (referrer, link name) pairs that point to the target node."""
+        self.drop_detached()
+        return [(node, lnk) for node, lnk in self.refs.get(target, ()) if link is None or lnk == link]
+
+    def referrers(self, target, link=None):
+        """Returns the nodes that refer to the target node (via the given link, if it is set) as a P4Node vector."""
+        return P4Node([node for node, _ in self.links(target, link)])
+
+
+def build_ref_index(hlir, attach=True):
+    """Builds the reverse reference index of the nodes reachable from hlir, and sets it as hlir.ref_index.
+    Example: hlir.ref_index.referrers(register_decl, 'decl_ref')"""
+    index = RefIndex()
+    for node in reachable_nodes(hlir, detached_node_types):
+        index.add_node(node)
+
+    if attach:
+        index.attach(hlir)
+
+    hlir.ref_index = index
+    return index
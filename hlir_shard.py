@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+import io
+import pickle
+import types
+
+from hlir16.p4node import P4Node
+from hlir16.hlir_utils import subnodes
+from hlir16.hlir_hash import is_reference
+
+
+# the references that are followed when the nodes of a unit are collected; other references lead out of the slice
+default_followed_refs = ('type_ref', 'hdr_ref', 'fld_ref', 'action_ref', 'table_ref', 'decl_ref')
+
+# attributes that are not copied into the slices
+default_skipped_attrs = ('json_data', 'xdir_cache', 'attr_observers', 'node_idx')
+
+
+def work_units(hlir):
+    """The controls (including the deparsers) and the parsers of the HLIR."""
+    return list(hlir.controls) + list(hlir.parsers)
+
+
+def unit_closure(hlir, unit, followed_refs=default_followed_refs):
+    """The nodes that belong to the slice of the unit (a dict: node -> None, in the order they are found):
+    the nodes below the unit, and the nodes they refer to through the followed references, transitively.
+    The HLIR root and hlir.all_nodes are never included."""
+    found = {unit: None}
+    todo = [unit]
+    while todo != []:
+        for key, subnode in subnodes(todo.pop()):
+            if subnode is hlir or subnode.node_type == 'all_nodes' or subnode in found:
+                continue
+            if type(key) is str and is_reference(key) and key not in followed_refs:
+                continue
+            found[subnode] = None
+            todo.append(subnode)
+    return found
+
+
+def _sliced_out(node):
+    """Stands for a node that is not part of the slice; as other INVALID nodes, it absorbs further attribute accesses."""
+    return P4Node({'name': 'INVALID', 'node_type': 'INVALID', 'sliced_out': f'{node.get_attr("node_type")} {node.get_attr("name")} #{node.Node_ID}'})
+
+
+class _Copier(object):
+    def __init__(self, skipped_attrs):
+        self.skipped_attrs = skipped_attrs
+        self.copies = {}
+        self.stubs = {}
+        # node -> the names of the units whose slices contain the node
+        self.node_units = {}
+
+    def copy_value(self, value):
+        if type(value) is P4Node:
+            if (copy := self.copies.get(value)) is not None:
+                return copy
+            if (stub := self.stubs.get(value)) is None:
+                stub = self.stubs[value] = _sliced_out(value)
+            return stub
+        if type(value) in (list, tuple, set, frozenset):
+            return type(value)(self.copy_value(elem) for elem in value)
+        if type(value) is dict:
+            return {self.copy_value(key): self.copy_value(elem) for key, elem in value.items()}
+        return value
+
+    def copy_parent_links(self, node, links):
+        """The links from the parents that are in all slices of the node; a slice is pickled with its own nodes
+        and the shared ones, so it must not link to the nodes of other slices."""
+        units = self.node_units[node]
+        return [(self.copies[parent], key) for parent, key in links if parent in self.copies if units <= self.node_units[parent]]
+
+    def fill(self, node):
+        copy = self.copies[node]
+        dct = copy.__dict__
+        for key, value in node.__dict__.items():
+            if key == 'node_parent_links' and key not in self.skipped_attrs:
+                dct[key] = self.copy_parent_links(node, value)
+            elif key not in self.skipped_attrs and type(value) not in (types.FunctionType, types.MethodType):
+                dct[key] = self.copy_value(value)
+
+
+class _SlicePickler(pickle.Pickler):
+    def __init__(self, out, shared_ids):
+        super().__init__(out, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = shared_ids
+
+    def persistent_id(self, obj):
+        return self.shared_ids.get(id(obj))
+
+
+class _SliceUnpickler(pickle.Unpickler):
+    def __init__(self, data, shared):
+        super().__init__(io.BytesIO(data))
+        self.shared = shared
+
+    def persistent_load(self, idx):
+        return self.shared[idx]
+
+
+class Shards(object):
+    """The slices of an HLIR (see shard_hlir).
+    units maps the name of a unit to the copy of the unit, and shared is the vector of the copied nodes
+    that belong to more than one slice (mostly types). The copies are independent of the original HLIR."""
+
+    def __init__(self, units, shared):
+        self.units = units
+        self.shared = shared
+        self.shared_ids = {id(node): idx for idx, node in enumerate(shared.vec)}
+
+    def shared_data(self):
+        """The shared nodes, pickled; a worker loads them once with load_shared."""
+        return pickle.dumps(self.shared, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def unit_data(self, name):
+        """The slice of the unit, pickled without the shared nodes; a worker loads it with load_unit."""
+        out = io.BytesIO()
+        _SlicePickler(out, self.shared_ids).dump(self.units[name])
+        return out.getvalue()
+
+
+def shard_hlir(hlir, units=None, followed_refs=default_followed_refs, skipped_attrs=default_skipped_attrs):
+    """Splits the HLIR into self-contained slices, one for each unit (by default, see work_units).
+    The slice of a unit contains copies of the nodes of its closure (see unit_closure);
+    a link to a node outside the slice is replaced by an INVALID node whose sliced_out attribute describes the node.
+    A node that is in the closure of several units is copied only once, and is shared by their slices.
+    The parent links (see P4Node.parent) are kept if the parent is in every slice the node is in,
+    so the unit itself has no parent, and a shared node may only have shared parents.
+    Functions stored in attributes and the attributes in skipped_attrs are not copied."""
+    closures = {unit.name: unit_closure(hlir, unit, followed_refs) for unit in units or work_units(hlir)}
+
+    copier = _Copier(skipped_attrs)
+    for name, closure in closures.items():
+        for node in closure:
+            copier.node_units.setdefault(node, set()).add(name)
+            if node not in copier.copies:
+                copier.copies[node] = copy = P4Node.__new__(P4Node)
+                object.__setattr__(copy, '__dict__', {})
+    for node in copier.copies:
+        copier.fill(node)
+
+    shared = P4Node({'node_type': 'shared_nodes'}, [copier.copies[node] for node, units in copier.node_units.items() if len(units) > 1])
+    return Shards({name: copier.copies[next(iter(closure))] for name, closure in closures.items()}, shared)
+
+
+def load_shared(data):
+    """Unpickles the shared nodes (see Shards.shared_data)."""
+    return pickle.loads(data).vec
+
+
+def load_unit(data, shared):
+    """Unpickles the slice of a unit (see Shards.unit_data); shared is the result of load_shared."""
+    return _SliceUnpickler(data, shared).load()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+from array import array
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+
+from hlir16.p4node import P4Node
+
+
+magic = b'HLIRSHM1'
+header_format = '<8sQ'
+
+# attributes that are not published: the raw JSON of a node would repeat the whole subtree below it,
+# and indexed_nodes is only useful together with the columns, which are arrays
+default_skipped_attrs = ('json_data', 'xdir_cache', 'attr_observers', 'indexed_nodes')
+
+# a link to a node is encoded as (Ellipsis, node index)
+_link_tag = Ellipsis
+
+_instance_dict = P4Node.__dict__['__dict__']
+
+
+def default_shared_dir():
+    """/dev/shm is memory-backed on Linux; elsewhere, the temporary directory is used."""
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class _Encoder(object):
+    def __init__(self, root, skipped_attrs):
+        self.skipped_attrs = skipped_attrs
+        self.indices = {root: 0}
+        self.nodes = [root]
+
+    def link(self, node):
+        if (idx := self.indices.get(node)) is None:
+            idx = self.indices[node] = len(self.nodes)
+            self.nodes.append(node)
+        return (_link_tag, idx)
+
+    def encode(self, value):
+        """Returns the value with the nodes in it replaced by links; raises TypeError if the value is not plain data."""
+        if type(value) in (str, int, float, bool) or value is None:
+            return value
+        if isinstance(value, P4Node):
+            return self.link(value)
+        if type(value) in (list, tuple, set, frozenset):
+            return type(value)(self.encode(elem) for elem in value)
+        if type(value) is dict:
+            return {self.encode(key): self.encode(elem) for key, elem in value.items()}
+        raise TypeError(f'{type(value).__name__} cannot be shared')
+
+    def record(self, node):
+        attrs = {}
+        for key, value in node.__dict__.items():
+            if key in self.skipped_attrs:
+                continue
+            try:
+                attrs[key] = self.encode(value)
+            except TypeError:
+                pass
+        return marshal.dumps(attrs)
+
+
+def publish_hlir(hlir, filename=None, skipped_attrs=default_skipped_attrs):
+    """Writes the nodes reachable from the HLIR into a file that worker processes can attach to with attach_hlir.
+    By default, the file is created in shared memory (see default_shared_dir); the caller should remove it when it is done.
+    Attributes whose values are not plain data (strings, numbers, nodes and lists, tuples, sets or dicts of them)
+    are left out, e.g. functions, arrays and index objects, and so are the skipped attributes.
+    Returns the name of the file."""
+    if filename is None:
+        fd, filename = tempfile.mkstemp(prefix='hlir_', suffix='.shm', dir=default_shared_dir())
+        os.close(fd)
+
+    encoder = _Encoder(hlir, skipped_attrs)
+    records = []
+    idx = 0
+    while idx < len(encoder.nodes):
+        records.append(encoder.record(encoder.nodes[idx]))
+        idx += 1
+
+    offsets = array('Q', [0]) * (len(records) + 1)
+    for idx, record in enumerate(records):
+        offsets[idx + 1] = offsets[idx] + len(record)
+
+    with open(filename, 'wb') as out:
+        out.write(struct.pack(header_format, magic, len(records)))
+        out.write(offsets.tobytes())
+        for record in records:
+            out.write(record)
+
+    return filename
+
+
+class SharedNode(P4Node):
+    """A read-only view of a node of a published HLIR.
+    Its attributes are decoded from the shared memory when the node is first used;
+    the nodes it links to are views, too. It supports the reading operations of P4Node;
+    the ones that would change a node (setting or deleting an attribute, set_attr, del_attr, append etc.) raise AttributeError."""
+
+    __slots__ = ('_shared', '_idx')
+
+    def __init__(self, shared, idx):
+        object.__setattr__(self, '_shared', shared)
+        object.__setattr__(self, '_idx', idx)
+
+    def _attrs(self):
+        dct = _instance_dict.__get__(self)
+        if dct == {}:
+            dct.update(self._shared.decode(self._idx))
+        return dct
+
+    __dict__ = property(_attrs)
+
+    def __getattr__(self, key):
+        if key.startswith('__'):
+            raise AttributeError(key)
+        if key in (dct := self._attrs()):
+            return dct[key]
+        return P4Node.__getattr__(self, key)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"Cannot set '{key}' of #{self.Node_ID}, the shared HLIR is read-only")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"Cannot delete '{key}' of #{self.Node_ID}, the shared HLIR is read-only")
+
+    def set_attr(self, key, value):
+        self.__setattr__(key, value)
+
+    def del_attr(self, key):
+        self.__delattr__(key)
+
+    def remove_attr(self, key):
+        self.__delattr__(key)
+
+    def append(self, elem):
+        raise AttributeError(f"Cannot append to #{self.Node_ID}, the shared HLIR is read-only")
+
+    def set_vec(self, vec):
+        self.__setattr__('vec', vec)
+
+
+class SharedHlir(object):
+    """A published HLIR attached to by memory-mapping its file; root is the view of the HLIR."""
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as shared_file:
+            self.mmap = mmap.mmap(shared_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        file_magic, self.node_count = struct.unpack_from(header_format, self.mmap)
+        if file_magic != magic:
+            raise ValueError(f'{filename} is not a published HLIR')
+
+        header_size = struct.calcsize(header_format)
+        data_start = header_size + 8 * (self.node_count + 1)
+        self.buffer = memoryview(self.mmap)
+        self.offsets = self.buffer[header_size:data_start].cast('Q')
+        self.data = self.buffer[data_start:]
+        self.views = {}
+        self.root = self.view(0)
+
+    def view(self, idx):
+        if (node := self.views.get(idx)) is None:
+            node = self.views[idx] = SharedNode(self, idx)
+        return node
+
+    def decode_value(self, value):
+        if type(value) is tuple and len(value) == 2 and value[0] is _link_tag:
+            return self.view(value[1])
+        if type(value) in (list, tuple, set, frozenset):
+            return type(value)(self.decode_value(elem) for elem in value)
+        if type(value) is dict:
+            return {self.decode_value(key): self.decode_value(elem) for key, elem in value.items()}
+        return value
+
+    def decode(self, idx):
+        attrs = marshal.loads(self.data[self.offsets[idx]:self.offsets[idx + 1]])
+        return {key: self.decode_value(value) for key, value in attrs.items()}
+
+    def close(self):
+        """The views must not be used after the HLIR is closed."""
+        self.offsets.release()
+        self.data.release()
+        self.buffer.release()
+        self.mmap.close()
+
+
+def attach_hlir(filename):
+    """Attaches to an HLIR published by publish_hlir, and returns its root as a read-only view (see SharedNode).
+    Only the header of the file is read at attaching; the pages of the file are shared by all processes that attach to it,
+    and each process decodes only the nodes it uses."""
+    return SharedHlir(filename).root
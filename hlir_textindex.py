@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+from bisect import bisect_left
+from itertools import count
+import time
+
+from hlir16.p4node import P4Node, _paths_new_nodes, _paths_matchtype, _path_of, observe, unobserve
+
+
+P4Node.define_common_attrs(['text_index'])
+
+
+def _prefixed(sorted_texts, prefix):
+    idx = bisect_left(sorted_texts, prefix)
+    while idx < len(sorted_texts) and sorted_texts[idx].startswith(prefix):
+        yield sorted_texts[idx]
+        idx += 1
+
+
+class TextIndex(object):
+    """An inverted index of the texts under a root node: the names of the nodes and the string and integer leaves.
+    The nodes are taken in the same breadth first order as in iter_paths_to,
+    a text is mapped to the places that hold it as (order, depth, search entry, attribute key) postings;
+    the key is None for the name of the node."""
+
+    def __init__(self, root):
+        self.root = root
+        self.is_stale = False
+        self.postings = {}
+        self.node_entries = {}
+
+        order = count()
+        level = [(root, None, None)]
+        self.node_entries[id(root)] = (0, level[0])
+        depth = 0
+        while level != []:
+            next_level = []
+            for entry in level:
+                node = entry[0]
+                if type(name := node.get_attr('name')) is str:
+                    self.postings.setdefault(name, []).append((next(order), depth, entry, None))
+
+                for key, subnode in _paths_new_nodes(node):
+                    if type(subnode) is P4Node:
+                        if id(subnode) not in self.node_entries:
+                            self.node_entries[id(subnode)] = (depth + 1, new_entry := (subnode, key, entry))
+                            next_level.append(new_entry)
+                    elif type(subnode) in (str, int) and key != 'name':
+                        self.postings.setdefault(f'{subnode}', []).append((next(order), depth, entry, key))
+            level = next_level
+            depth += 1
+
+        self.texts = sorted(self.postings.keys())
+        self.reversed_texts = sorted(text[::-1] for text in self.texts)
+
+    def on_change(self, node, key, old_value, new_value):
+        """The index is not updated, it is marked stale at the first change of an indexed node, and rebuilt at the next search.
+        The changes of other nodes (e.g. the INVALID nodes of failed path lookups) are ignored."""
+        if id(node) not in self.node_entries or node.get_attr('node_type') == 'INVALID':
+            return
+        if key == 'name' or key not in P4Node.common_attrs:
+            self.mark_stale()
+
+    def on_new_nodes(self, nodes):
+        """New nodes are only indexed if they are linked to an indexed node, which is reported by on_change."""
+        pass
+
+    def mark_stale(self):
+        self.is_stale = True
+        self.detach()
+
+    def attach(self):
+        observe(self.root, self)
+
+    def detach(self):
+        unobserve(self.root, self)
+
+    def exact(self, value):
+        return [value] if value in self.postings else []
+
+    def prefixed(self, value):
+        """The indexed texts that start with the value."""
+        return list(_prefixed(self.texts, value))
+
+    def suffixed(self, value):
+        """The indexed texts that end with the value."""
+        return [text[::-1] for text in _prefixed(self.reversed_texts, value[::-1])]
+
+    def containing(self, value):
+        return [text for text in self.texts if value in text]
+
+    def find(self, value, matchtypes='=<>∊'):
+        """Returns the indexed texts that match the value with one of the match types (see _paths_matchtype)."""
+        valuetxt = f'{value}'
+        if matchtypes == '=':
+            return self.exact(valuetxt)
+        if set(matchtypes) <= set('=<'):
+            return self.prefixed(valuetxt)
+        if set(matchtypes) <= set('=>'):
+            return self.suffixed(valuetxt)
+        return [text for text in self.containing(valuetxt) if _paths_matchtype(text, valuetxt) in matchtypes]
+
+    def iter_paths(self, node_or_value, max_depth=20, max_results=None, time_budget=None):
+        """Yields the same kind of results as iter_paths_to, in the same order.
+        As in iter_paths_to, nothing is reported below a node whose name matches.
+        The results may differ from iter_paths_to's where a node is reachable only through such a node."""
+        if type(node_or_value) is P4Node:
+            if (found := self.node_entries.get(id(node_or_value))) is not None and found[0] < max_depth:
+                yield (_path_of(found[1]), '=', node_or_value.get_attr('name'), node_or_value)
+            return
+
+        valuetxt = f'{node_or_value}'
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+        hits = sorted((posting, text) for text in self.containing(valuetxt) for posting in self.postings[text] if posting[1] < max_depth)
+        named_hits = set(id(entry) for (_, _, entry, key), _ in hits if key is None)
+
+        result_count = 0
+        for (_, _, entry, key), text in hits:
+            if max_results is not None and result_count >= max_results:
+                return
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            if self.is_below_named_hit(entry if key is None else (None, None, entry), named_hits):
+                continue
+
+            result_count += 1
+            path = _path_of(entry) if key is None else _path_of(entry) + [key]
+            yield (path, _paths_matchtype(text, valuetxt), text, entry[0])
+
+    @staticmethod
+    def is_below_named_hit(entry, named_hits):
+        entry = entry[2]
+        while entry is not None:
+            if id(entry) in named_hits:
+                return True
+            entry = entry[2]
+        return False
+
+
+def build_text_index(root):
+    """Builds the text index of the nodes under root (usually hlir), and sets it as root.text_index.
+    The index is marked stale when a node is changed by set_attr or del_attr; see get_text_index.
+    Plain assignments (node.attr = value) are not observed: after them, call mark_stale on the index."""
+    index = TextIndex(root)
+    index.attach()
+    root.text_index = index
+    return index
+
+
+def get_text_index(root):
+    """Returns the text index of the root, (re)building it if necessary."""
+    if 'text_index' not in root or root.text_index.is_stale:
+        return build_text_index(root)
+    return root.text_index
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 Eotvos Lorand University, Budapest, Hungary
+
+# run as: PYTHONPATH=.. python3 hlir_trace.py program.json --sort self --top 40 --collapsed program.folded
+#         (program.folded can be turned into a flame graph by e.g. flamegraph.pl or speedscope)
+
+import argparse
+import json
+import sys
+import time
+
+import hlir16.hlir
+import hlir16.hlir_attrs
+from hlir16.p4node import P4Node
+
+
+# the column names of the report rows, the ones that can be sorted by are after the first three
+report_columns = ('pass', 'kind', 'key', 'count', 'total', 'self')
+
+# the label of the events outside the attribute passes
+no_pass = '(no pass)'
+
+
+def _fun_text(fun):
+    code = getattr(fun, '__code__', None)
+    if code is None:
+        return getattr(fun, '__qualname__', repr(fun))
+    return f"{fun.__qualname__}@{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}"
+
+
+def _predicate_text(fun_or_path, value=None):
+    txt = fun_or_path if type(fun_or_path) is str else _fun_text(fun_or_path)
+    return txt if value is None else f'{txt}=={repr(value)[:40]}'
+
+
+class Tracer(object):
+    """Collects the number of calls and the time spent in the traced P4Node operations.
+    The stats are keyed by (attribute pass, kind, key), where kind is one of getattr, call, filter, map, by_type,
+    and the key is the attribute name, the path, the predicate or the type name.
+    The total time of an event includes the time of the traced events within it, the self time does not.
+    The stacks are the chains of nested events (starting with the pass) with their self time."""
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        self.current_pass = no_pass
+        self.frames = []
+        self.originals = None
+
+    def begin(self, label):
+        parent_labels = self.frames[-1][0] if self.frames != [] else (self.current_pass,)
+        self.frames.append([parent_labels + (label,), 0, time.perf_counter_ns()])
+
+    def end(self, kind, key):
+        labels, child_time, start = self.frames.pop()
+        elapsed = time.perf_counter_ns() - start
+        if self.frames != []:
+            self.frames[-1][1] += elapsed
+
+        if (stat := self.stats.get(stat_key := (self.current_pass, kind, key))) is None:
+            stat = self.stats[stat_key] = [0, 0, 0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += elapsed - child_time
+        self.stacks[labels] = self.stacks.get(labels, 0) + elapsed - child_time
+
+    def traced_pass(self, fun):
+        name = hlir16.hlir_attrs.attr_fun_name(fun)
+        def run_pass(hlir):
+            outer_pass, outer_frames = self.current_pass, self.frames
+            self.current_pass, self.frames = name, [[(name,), 0, time.perf_counter_ns()]]
+            try:
+                return fun(hlir)
+            finally:
+                self.end('pass', name)
+                self.current_pass, self.frames = outer_pass, outer_frames
+        return run_pass
+
+    def enable(self):
+        """Replaces the traced operations of P4Node (and the attribute passes) by their traced versions."""
+        if self.originals is not None:
+            return
+        tracer = self
+        originals = self.originals = {name: P4Node.__dict__[name] for name in ('__getattr__', '__call__', 'filter', 'map', 'by_type')}
+        originals['default_attr_funs'] = hlir16.hlir_attrs.default_attr_funs
+
+        def __getattribute__(node, key):
+            if key[0] == '_' or key not in (dct := object.__getattribute__(node, '__dict__')):
+                return object.__getattribute__(node, key)
+            tracer.begin(key)
+            tracer.end('getattr', key)
+            return dct[key]
+
+        def __getattr__(node, key):
+            tracer.begin(key)
+            try:
+                return originals['__getattr__'](node, key)
+            finally:
+                tracer.end('getattr', key)
+
+        def traced(kind, original, key_text):
+            def traced_op(node, *args, **kwargs):
+                key = key_text(*args, **kwargs)
+                tracer.begin(f'{kind} {key}')
+                try:
+                    return original(node, *args, **kwargs)
+                finally:
+                    tracer.end(kind, key)
+            return traced_op
+
+        P4Node.__getattribute__ = __getattribute__
+        P4Node.__getattr__ = __getattr__
+        P4Node.__call__ = traced('call', originals['__call__'], lambda key, *args, **kwargs: key)
+        P4Node.filter = traced('filter', originals['filter'], _predicate_text)
+        P4Node.map = traced('map', originals['map'], lambda str_or_fun: _predicate_text(str_or_fun))
+        P4Node.by_type = traced('by_type', originals['by_type'], lambda typename, strict=False: typename)
+        hlir16.hlir_attrs.default_attr_funs = lambda *args: [self.traced_pass(fun) for fun in originals['default_attr_funs'](*args)]
+
+    def disable(self):
+        """Restores the original operations, after which tracing costs nothing."""
+        if self.originals is None:
+            return
+        del P4Node.__getattribute__
+        for name in ('__getattr__', '__call__', 'filter', 'map', 'by_type'):
+            setattr(P4Node, name, self.originals[name])
+        hlir16.hlir_attrs.default_attr_funs = self.originals['default_attr_funs']
+        self.originals = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def rows(self, sort_by='total', kinds=None):
+        """The stats as (pass, kind, key, count, total seconds, self seconds) tuples, sorted by the given column (descending)."""
+        rows = [(pass_, kind, key, count, total / 1e9, self_time / 1e9) for (pass_, kind, key), (count, total, self_time) in self.stats.items()
+                if kinds is None or kind in kinds]
+        return sorted(rows, key=lambda row: -row[report_columns.index(sort_by)])
+
+    def report(self, sort_by='total', top=30, kinds=None):
+        lines = [f"{'pass':34} {'kind':8} {'key':50} {'count':>9} {'total':>9} {'self':>9}"]
+        for pass_, kind, key, count, total, self_time in self.rows(sort_by, kinds)[:top]:
+            lines.append(f'{pass_[:34]:34} {kind:8} {key[:50]:50} {count:9} {total:8.3f}s {self_time:8.3f}s')
+        return '\n'.join(lines)
+
+    def write_collapsed(self, filename):
+        """Writes the stacks in the collapsed format of flamegraph.pl ("frame;frame;frame value"), the values are in microseconds."""
+        with open(filename, 'w') as out:
+            for labels, self_time in sorted(self.stacks.items()):
+                if (value := self_time // 1000) > 0:
+                    frames = ';'.join(label.replace(';', ',').replace(' ', '_') if idx == 0 else label.replace(';', ',') for idx, label in enumerate(labels))
+                    out.write(f'{frames} {value}\n')
+
+
+def tracing():
+    """A context manager that traces the P4Node operations within it, and gives the Tracer:
+
+    with tracing() as tracer:
+        set_additional_attrs(hlir, p4_filename, 16)
+    print(tracer.report(sort_by='self'))"""
+    return Tracer()
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Traces the P4Node operations while a program is loaded')
+    parser.add_argument('json_file', help='The output of p4test --toJSON')
+    parser.add_argument('--sort', choices=report_columns[3:], default='total')
+    parser.add_argument('--top', type=int, default=40)
+    parser.add_argument('--kind', action='append', choices=['pass', 'getattr', 'call', 'filter', 'map', 'by_type'], help='Shows only these kinds of events')
+    parser.add_argument('--collapsed', metavar='FILE', help='Writes the stacks in the collapsed format of flame graph tools')
+    args = parser.parse_args(args)
+
+    with open(args.json_file, 'r') as json_in:
+        json_root = json.load(json_in)
+
+    with tracing() as tracer:
+        hlir = hlir16.hlir.walk_json_from_top(json_root)
+        hlir16.hlir_attrs.set_additional_attrs(hlir, args.json_file, 16)
+
+    print(tracer.report(args.sort, args.top, args.kind))
+    if args.collapsed:
+        tracer.write_collapsed(args.collapsed)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -19,7 +19,9 @@ def align8_16_32(size):
 
 
 def unique_list(elems):
-    return list(set(elems))
+    """The elements without repetition, in the order of their first occurrence,
+    so that the result does not depend on the hashes (memory addresses) of the elements."""
+    return list(dict.fromkeys(elems))
 
 
 def shorten_locvar_names(locvars, last_infix='_'):
@@ -89,3 +91,30 @@ def unique_everseen(items):
     Equivalent to unique_everseen from the package more-itertools."""
     from collections import OrderedDict
     return list(OrderedDict.fromkeys(items))
+
+
+def is_ref_link(attrname):
+    """Links such as type_ref or hdr_ref are added by the attribute passes,
+    and point to a node that resides elsewhere in the HLIR."""
+    return type(attrname) is str and attrname.endswith('_ref')
+
+
+def subnodes(node):
+    """Yields (key, subnode) pairs for the vector elements and the noncommon attributes of the node
+    that are P4Nodes themselves."""
+    if node.vec is not None:
+        yield from ((idx, elem) for idx, elem in enumerate(node.vec) if type(elem) is P4Node)
+    yield from ((key, value) for key, value in node.__dict__.items() if type(value) is P4Node if key not in P4Node.common_attrs)
+
+
+def reachable_nodes(root, skipped_types=()):
+    """Returns all P4Nodes that are reachable from the root via subnodes, including the root.
+    The nodes of the skipped types are not descended into (e.g. 'all_nodes', which lists every loaded node)."""
+    found = {id(root): root}
+    todo = [root]
+    while todo:
+        for _, subnode in subnodes(todo.pop()):
+            if id(subnode) not in found and subnode.get_attr('node_type') not in skipped_types:
+                found[id(subnode)] = subnode
+                todo.append(subnode)
+    return list(found.values())
@@ -5,12 +5,30 @@
 # Copyright 2024 Eotvos Lorand University, Budapest, Hungary
 
 # run as: PYTHONPATH=.. python3 load_p4.py -I tnacodes -I tnacodes/simple_switch -o"__TARGET_TOFINO__=1" tnacodes/fastreact/two_by_two.p4
+#         PYTHONPATH=.. python3 load_p4.py --stats --stats-json stats.json prog1.p4 prog2.p4 prog3.json
+#         PYTHONPATH=.. python3 load_p4.py --cache-dir ~/.cache/hlir16 --dump headers:name --dump controls --depth 1 prog.p4
+# the exit status is 0 if all programs are loaded without errors, 1 if a program has errors (or warnings, with --werror),
+# and 2 if a program cannot be loaded
 
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
 import os
-import ujson
-import hlir16.hlir
 import sys
-import argparse
+import time
+import tracemalloc
+
+import hlir16.hlir
+import hlir16.hlir_attrs
+import hlir16.hlir_json
+
+
+exit_ok = 0
+exit_p4_errors = 1
+exit_load_failed = 2
+
 
 def init_p4c():
     p4c_dir = os.environ.get('P4C')
@@ -20,54 +38,223 @@ def init_p4c():
 
     return p4c_dir
 
-def print_we(xs, typetxt):
+def print_we(xs, typetxt, out=sys.stdout):
     if len(xs) == 0:
         return
 
-    print(f'{len(xs)} {typetxt}:')
+    print(f'{len(xs)} {typetxt}:', file=out)
 
     for msg in xs:
         msg, msg2 = msg
-        print(f'    {msg}: {msg2}')
+        print(f'    {msg}: {msg2}', file=out)
+
+
+def print_warnings_errors(hlir, out=sys.stdout):
+    print_we(hlir.t4p4s.warnings, 'warnings', out)
+    print_we(hlir.t4p4s.errors, 'errors', out)
 
 
-def print_warnings_errors():
-    print_we(hlir.t4p4s.warnings, 'warnings')
-    print_we(hlir.t4p4s.errors, 'errors')
+@contextlib.contextmanager
+def _stage(stats, name):
+    """Records the runtime of a loading stage (and the traced memory after it, if tracemalloc is on) in stats."""
+    start = time.perf_counter()
+    yield
+    stats.setdefault('times', {})[name] = time.perf_counter() - start
+    if tracemalloc.is_tracing():
+        stats.setdefault('memory', {})[name] = tracemalloc.get_traced_memory()[0]
 
 
-def load_hlir(p4_file, json_file=None):
-    init_p4c()
+def load_hlir(p4_file, json_file=None, include_dirs=(), opts=(), stats=None, freeze=False, json_backend=None):
+    """Loads a P4 program (or the JSON output of p4test) and computes the additional attributes.
+    The P4 file is compiled by p4test (see $P4C) if its JSON file does not exist yet.
+    The JSON is parsed by json_backend (see hlir_json.json_backend; by default, the fastest installed one).
+    If stats (a dict) is given, the runtime of each stage ('times') and of each attribute pass ('passes') are put into it.
+    If freeze is set, the whole heap (with the HLIR) is moved to the permanent generation of the garbage collector
+    (see hlir.bulk_build); it is never unfrozen, so the HLIR is not freed even when it is no longer used.
+    Raises ValueError if the program cannot be compiled."""
+    stats = {} if stats is None else stats
 
     p4v = '16'
     if json_file is None:
-        json_file = p4_file.replace('.p4', '.json')
+        json_file = p4_file if p4_file.endswith('.json') else p4_file.replace('.p4', '.json')
 
     if not os.path.isfile(json_file):
-        json_file = hlir16.hlir.p4_to_json(p4_file, p4_include_dirs=args.include, opts=args.option)
+        p4c_dir = os.environ.get('P4C')
+        if p4c_dir is None or not os.path.isdir(p4c_dir):
+            raise ValueError(f'{p4_file} cannot be compiled: environment variable $P4C not set')
+        with _stage(stats, 'p4_to_json'):
+            json_file = hlir16.hlir.p4_to_json(p4_file, p4_include_dirs=list(include_dirs), opts=list(opts))
+        if json_file is None or not os.path.isfile(json_file):
+            raise ValueError(f'{p4_file} cannot be compiled: JSON file was not generated')
 
-    if not os.path.isfile(json_file):
-        print("Exiting, reason: JSON file was not generated")
-        sys.exit(1)
+    stats['json_backend'] = json_backend = hlir16.hlir_json.json_backend(json_backend)
+    with _stage(stats, 'json_parse'):
+        json_root = hlir16.hlir_json.load_json(json_file, json_backend)
 
-    with open(json_file, 'r') as json:
-        json_root = ujson.load(json)
+    passes = stats.setdefault('passes', {})
+    with hlir16.hlir.bulk_build(freeze=freeze):
+        with _stage(stats, 'walk_json'):
+            hlir = hlir16.hlir.walk_json_from_top(json_root)
+        with _stage(stats, 'attrs'):
+            for fun in hlir16.hlir_attrs.default_attr_funs(p4_file, p4v):
+                start = time.perf_counter()
+                fun(hlir)
+                passes[hlir16.hlir_attrs.attr_fun_name(fun)] = time.perf_counter() - start
 
-    hlir = hlir16.hlir.walk_json_from_top(json_root)
-    hlir16.hlir_attrs.set_additional_attrs(hlir, p4_file, p4v)
+    stats['nodes'] = len(hlir.all_nodes)
     return hlir
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-I", "--include", action='append', help="Include files")
-    parser.add_argument("-o", "--option", action='append', help="Options")
-    parser.add_argument("p4_filename", help="P4 filename")
-    args = parser.parse_args()
+def _package_fingerprint():
+    """The hash of the sources of the package; a cached HLIR is only valid for the same sources."""
+    digest = hashlib.sha256()
+    for filename in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(filename, 'rb') as source:
+            digest.update(os.path.basename(filename).encode())
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def cache_filename(cache_dir, p4_file, include_dirs=(), opts=()):
+    """The file of the attributed HLIR of the program in the cache directory;
+    it depends on the contents of the program, the compiler options and the sources of the package."""
+    from hlir16.hlir_daemon import source_hash
+    key = hashlib.sha256(f'{source_hash(p4_file, opts, include_dirs)} {_package_fingerprint()}'.encode()).hexdigest()
+    return os.path.join(cache_dir, f'{key[:32]}.hlir')
 
-    hlir = load_hlir(args.p4_filename)
 
-    print(f'File {args.p4_filename} is loaded')
-    print_warnings_errors()
+def load_cached_hlir(p4_file, cache_dir, include_dirs=(), opts=(), stats=None, refresh=False, json_backend=None):
+    """As load_hlir, but the attributed HLIR is read from the cache directory if it is there, and written there otherwise.
+    A cached HLIR is a read-only view (see hlir_shared.attach_hlir); stats['cache'] tells if it was a 'hit' or a 'miss'."""
+    from hlir16.hlir_shared import publish_hlir, attach_hlir
+
+    stats = {} if stats is None else stats
+    filename = cache_filename(cache_dir, p4_file, include_dirs, opts)
+    if not refresh and os.path.isfile(filename):
+        stats['cache'] = 'hit'
+        with _stage(stats, 'cache_read'):
+            hlir = attach_hlir(filename)
+        stats['nodes'] = len(hlir.all_nodes)
+        return hlir
+
+    stats['cache'] = 'miss'
+    hlir = load_hlir(p4_file, None, include_dirs, opts, stats, json_backend=json_backend)
+    os.makedirs(cache_dir, exist_ok=True)
+    with _stage(stats, 'cache_write'):
+        tmp_filename = publish_hlir(hlir, f'{filename}.{os.getpid()}.tmp')
+        os.replace(tmp_filename, filename)
+    return hlir
+
 
-    breakpoint()
+def print_stats(p4_file, stats, top_passes, out):
+    times = stats.get('times', {})
+    memory = stats.get('memory', {})
+    cache_txt = f", cache {stats['cache']}" if 'cache' in stats else ''
+    backend_txt = f", {stats['json_backend']}" if 'json_backend' in stats else ''
+    peak_txt = f", traced peak {stats['peak_memory'] / 2**20:.1f} MiB" if 'peak_memory' in stats else ''
+    print(f"{p4_file}: {stats.get('nodes', 0)} nodes, {sum(times.values()):.3f}s{backend_txt}{cache_txt}, max RSS {stats['max_rss'] / 2**20:.1f} MiB{peak_txt}", file=out)
+    for stage, stage_time in times.items():
+        memory_txt = f'  {memory[stage] / 2**20:8.1f} MiB' if stage in memory else ''
+        print(f'    {stage:40} {stage_time:8.4f}s{memory_txt}', file=out)
+    for name, pass_time in sorted(stats.get('passes', {}).items(), key=lambda item: -item[1])[:top_passes]:
+        print(f'        {name:36} {pass_time:8.4f}s', file=out)
+
+
+def max_rss():
+    """The peak resident set size of the process in bytes."""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def dump_paths(hlir, paths, depth):
+    """The JSON representation of the nodes reached by the paths; a path may end in :map_path (see hlir_daemon.select)."""
+    from hlir16.hlir_daemon import select, compact
+
+    dumps = {}
+    for path in paths:
+        node_path, _, map_path = path.partition(':')
+        dumps[path] = compact(select(hlir, node_path or None, map_path=map_path or None), depth)
+    return dumps
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Loads P4 programs (or their p4test JSON output) into the HLIR')
+    parser.add_argument("-I", "--include", action='append', default=[], help="Include files")
+    parser.add_argument("-o", "--option", action='append', default=[], help="Options")
+    parser.add_argument("p4_filenames", nargs='+', metavar='p4_filename', help="P4 filenames (or JSON files)")
+    parser.add_argument('--werror', action='store_true', help='Warnings count as errors in the exit status')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Prints only the warnings and errors')
+    parser.add_argument('--stats', action='store_true', help='Prints the runtime of the stages and the peak memory for each program')
+    parser.add_argument('--stats-json', metavar='FILE', help='Writes the statistics of the programs as JSON')
+    parser.add_argument('--top-passes', type=int, default=5, help='Number of the slowest attribute passes shown with --stats')
+    parser.add_argument('--freeze-gc', action='store_true', help='Moves the loaded HLIRs to the permanent generation of the garbage collector; they are not freed until the end')
+    parser.add_argument('--trace-memory', action='store_true', help='Measures the memory after each stage with tracemalloc (slows down loading)')
+    parser.add_argument('--json-backend', choices=hlir16.hlir_json.preferred_backends,
+                        help=f'The JSON parser (default: ${hlir16.hlir_json.backend_env_var}, or the fastest installed one)')
+    parser.add_argument('--cache-dir', metavar='DIR', help='Reads the attributed HLIRs from this directory, and writes them there if they are missing')
+    parser.add_argument('--refresh-cache', action='store_true', help='Loads the programs and rewrites their cache files')
+    parser.add_argument('--dump', action='append', default=[], metavar='PATH[:MAP]', help='Dumps the subtree at the path as JSON (can be repeated)')
+    parser.add_argument('--depth', type=int, default=0, help='Depth of the dumped subtrees')
+    parser.add_argument('--output', metavar='FILE', help='Writes the dumps into this file instead of the standard output')
+    args = parser.parse_args(args)
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    status = exit_ok
+    all_stats = {}
+    all_dumps = {}
+    for p4_file in args.p4_filenames:
+        stats = all_stats[p4_file] = {}
+        try:
+            if args.cache_dir:
+                hlir = load_cached_hlir(p4_file, args.cache_dir, args.include, args.option, stats, args.refresh_cache, args.json_backend)
+            else:
+                hlir = load_hlir(p4_file, None, args.include, args.option, stats, freeze=args.freeze_gc, json_backend=args.json_backend)
+        except Exception as e:
+            print(f'{p4_file}: cannot be loaded: {type(e).__name__}: {e}', file=sys.stderr)
+            stats['error'] = f'{type(e).__name__}: {e}'
+            status = max(status, exit_load_failed)
+            continue
+
+        stats['max_rss'] = max_rss()
+        if args.trace_memory:
+            stats['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        stats['warnings'] = len(hlir.t4p4s.warnings)
+        stats['errors'] = len(hlir.t4p4s.errors)
+
+        if not args.quiet:
+            print(f'File {p4_file} is loaded', file=sys.stderr)
+        print_warnings_errors(hlir, sys.stderr)
+        if args.stats:
+            print_stats(p4_file, stats, args.top_passes, sys.stderr)
+
+        if stats['errors'] > 0 or (args.werror and stats['warnings'] > 0):
+            status = max(status, exit_p4_errors)
+
+        if args.dump != []:
+            try:
+                all_dumps[p4_file] = dump_paths(hlir, args.dump, args.depth)
+            except ValueError as e:
+                print(f'{p4_file}: cannot be dumped: {e}', file=sys.stderr)
+                status = max(status, exit_load_failed)
+        del hlir
+
+    if args.stats_json:
+        with open(args.stats_json, 'w') as stats_out:
+            json.dump(all_stats, stats_out, indent=2)
+    if args.dump != []:
+        dumps = all_dumps.get(args.p4_filenames[0], {}) if len(args.p4_filenames) == 1 else all_dumps
+        if args.output:
+            with open(args.output, 'w') as dump_out:
+                json.dump(dumps, dump_out, indent=2)
+        else:
+            json.dump(dumps, sys.stdout, indent=2)
+            print()
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
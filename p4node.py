@@ -4,43 +4,58 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2017 Eotvos Lorand University, Budapest, Hungary
 
-import pkgutil
+import sys
 import types
 import collections
-from itertools import dropwhile, chain, groupby
+import time
+from itertools import dropwhile, chain, groupby, islice
 
 extra_node_id = -1
 
-is_using_colours = pkgutil.find_loader('colored')
-if pkgutil.find_loader('colored'):
-    from colored import fg, bg, attr
-
-    clr_attrname = fg('green')
-    clr_count = fg('red')
-    clr_nodeid = fg('magenta')
-    clr_nodetype = fg('cyan')
-    clr_hex = fg('cyan')
-    clr_value = fg('yellow')
-    clr_extrapath = fg('magenta_2a')
-    clr_off = fg('light_gray') + bg('dark_blue')
-    clr_function = fg('magenta')
-else:
-    # note: these variables are accessed later on, they need to be defined
-    clr_attrname = None
-    clr_count = None
-    clr_nodeid = None
-    clr_nodetype = None
-    clr_hex = None
-    clr_value = None
-    clr_extrapath = None
-    clr_off = None
-    clr_function = None
+
+# the colours of the printouts, see _c; colored is only imported when something is first printed in colour
+clr_attrname = 'attrname'
+clr_count = 'count'
+clr_nodeid = 'nodeid'
+clr_nodetype = 'nodetype'
+clr_hex = 'hex'
+clr_value = 'value'
+clr_extrapath = 'extrapath'
+clr_off = 'off'
+clr_function = 'function'
+clr_reset = 'reset'
+
+_colour_codes = False
+
+
+def _colours():
+    """The escape sequences of the colours, or None if the colored package is not available."""
+    global _colour_codes
+    if _colour_codes is False:
+        try:
+            from colored import fg, bg, attr
+        except ImportError:
+            _colour_codes = None
+        else:
+            _colour_codes = {
+                clr_attrname: fg('green'),
+                clr_count: fg('red'),
+                clr_nodeid: fg('magenta'),
+                clr_nodetype: fg('cyan'),
+                clr_hex: fg('cyan'),
+                clr_value: fg('yellow'),
+                clr_extrapath: fg('magenta_2a'),
+                clr_off: fg('light_gray') + bg('dark_blue'),
+                clr_function: fg('magenta'),
+                clr_reset: attr('reset'),
+            }
+    return _colour_codes
 
 
 def _c(txt, colour, show_colours=True):
-    if not is_using_colours or not show_colours:
+    if not show_colours or (colours := _colours()) is None:
         return f'{txt}'
-    return f'{colour}{txt}{attr("reset")}'
+    return f'{colours[colour]}{txt}{colours[clr_reset]}'
 
 
 def get_fresh_node_id():
@@ -80,52 +95,44 @@ def print_path(pathinfo, root, max_length=70, max_width=30):
     print(f'{nodetxt:{max_width}} {matchtype} {path_txt}')
 
 
-def first_n(g, max_count):
-    """Runs a generator for at most max_count steps."""
-    count = 1
-    for item in g:
-        if count == max_count:
-            return
-        yield item
-        count += 1
-
-
-def paths_to(root, node_or_value, max_depth=20, sort_by_path_length=False, max_length=70):
-    """Sorts using path text by default."""
-    found_paths = _paths_to_recurse(root, node_or_value, max_depth=max_depth)
-
-    first100 = list(first_n(found_paths, 256))
-    max_width = max(1, max((len(nodetxt or "") for _, _, nodetxt, _ in first100), default=30))
-
-    chained = chain(first100, found_paths)
-    paths = list(sorted(chained, key=lambda pathinfo: len(pathinfo[0])) if sort_by_path_length else chained)
-
-    count = 0
-    for path in paths:
+def paths_to(root, node_or_value, max_depth=20, sort_by_path_length=False, max_length=70, max_results=None, time_budget=None, use_index=False):
+    """Prints the paths under root through which the node or value is accessible.
+    The search is breadth first, therefore the paths are found (and printed) in order of their length;
+    sort_by_path_length is kept for compatibility.
+    The search can be limited by the number of results and by a time budget (in seconds).
+    With use_index set, the search uses the text index of root (see hlir_textindex.py), which is built at the first such search;
+    the index does not see plain assignments (node.attr = value), only set_attr and del_attr."""
+    if use_index:
+        from hlir16.hlir_textindex import get_text_index
+        found_paths = get_text_index(root).iter_paths(node_or_value, max_depth=max_depth, max_results=max_results, time_budget=time_budget)
+    else:
+        found_paths = iter_paths_to(root, node_or_value, max_depth=max_depth, max_results=max_results, time_budget=time_budget)
+
+    first_batch = list(islice(found_paths, 256))
+    max_width = max(1, max((len(nodetxt or "") for _, _, nodetxt, _ in first_batch), default=30))
+
+    paths = []
+    for path in chain(first_batch, found_paths):
         print_path(path, root, max_length=max_length, max_width=max_width)
-        count += 1
+        paths.append(path)
 
-    print(f'{count} results found, search started at {root.str(details=False)}')
+    print(f'{len(paths)} results found, search started at {root.str(details=False)}')
 
     return paths
 
 
-def _paths_new_nodes(node, founds):
-    if type(node) is list:
-        return ((idx, subnode) for idx, subnode in enumerate(node) if subnode not in founds)
-    elif type(node) is dict:
-        return ((key, subnode) for key in node if (subnode := node[key]) not in founds)
-    elif type(node) is not P4Node:
-        return ()
+def _paths_new_nodes(node):
+    """Yields (key, subnode) pairs for the vector elements and the noncommon attributes of the node."""
     if node.node_type == 'all_nodes':
-        return ()
-    elif node.is_vec():
+        return
+    if node.vec is not None:
         if type(node.vec) is dict:
-            return ((key, node.vec[key]) for key in sorted(node.vec.keys()))
+            yield from ((key, node.vec[key]) for key in sorted(node.vec.keys()))
         else:
-            return ((idx, node[idx]) for idx, elem in enumerate(node.vec))
+            yield from enumerate(node.vec)
+        return
 
-    return ((attr, getattr(node, attr)) for attr in node.xdir(show_colours=False))
+    yield from ((key, value) for key, value in node.__dict__.items() if key not in P4Node.common_attrs)
 
 def _paths_matchtype(nodetxt, valuetxt):
     if nodetxt == valuetxt:
@@ -136,29 +143,275 @@ def _paths_matchtype(nodetxt, valuetxt):
         return '>'
     return '∊'
 
-def _paths_to_recurse(node, node_or_value, max_depth=20, path=[], found_nodes=set()):
-    """Finds the paths under node through which the value is accessible."""
-    if max_depth < 1:
-        return
+def _path_of(entry):
+    """The entries of the search are (node, key, previous entry) triples."""
+    path = []
+    while entry[2] is not None:
+        path.append(entry[1])
+        entry = entry[2]
+    return path[::-1]
+
+def iter_paths_to(root, node_or_value, max_depth=20, max_results=None, time_budget=None):
+    """Yields (path, matchtype, nodetxt, node) tuples for the places under root
+    where the node is found, or where the name of a node or a leaf value (string, integer) contains the value.
+    The search is breadth first, every node is visited at most once."""
+    is_node_search = isinstance(node_or_value, P4Node)
+    valuetxt = None if is_node_search else f'{node_or_value}'
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    result_count = 0
+    visited = {id(root)}
+    level = [(root, None, None)]
+    for depth in range(max_depth):
+        next_level = []
+        for entry in level:
+            if max_results is not None and result_count >= max_results:
+                return
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+
+            node = entry[0]
+            if is_node_search:
+                if node is node_or_value:
+                    result_count += 1
+                    yield (_path_of(entry), '=', node.get_attr('name'), node)
+                    continue
+            elif type(name := node.get_attr('name')) is str and valuetxt in name:
+                result_count += 1
+                yield (_path_of(entry), _paths_matchtype(name, valuetxt), name, node)
+                continue
 
-    if type(node_or_value) is P4Node and node == node_or_value:
-        p4_node_txt = node.name if 'name' in node else None
-        yield (path, '=', p4_node_txt, node)
-        return
+            for key, subnode in _paths_new_nodes(node):
+                if isinstance(subnode, P4Node):
+                    if id(subnode) not in visited:
+                        visited.add(id(subnode))
+                        next_level.append((subnode, key, entry))
+                elif not is_node_search and type(subnode) in (str, int) and valuetxt in (nodetxt := f'{subnode}'):
+                    result_count += 1
+                    yield (_path_of(entry) + [key], _paths_matchtype(nodetxt, valuetxt), nodetxt, node)
+                    if max_results is not None and result_count >= max_results:
+                        return
+        level = next_level
+
+
+# increased when the set of common attributes changes, this invalidates the cached attribute listings
+_xdir_generation = 0
+
+# the followable paths that the plans were made from, and the plans:
+# attribute name -> (rest of the path as a tuple, rest of the path as text) pairs
+_follow_plans_source = None
+_follow_plans = {}
+
+_xdir_order_parts = ('#', '**', '*', '.')
+
+def _get_follow_plans():
+    global _follow_plans_source, _follow_plans
+    if (source := tuple(P4Node.followable_paths)) != _follow_plans_source:
+        _follow_plans = {}
+        for path in source:
+            attrname, *rest = path.split('.')
+            _follow_plans.setdefault(attrname, []).append((tuple(rest), '.'.join(rest)))
+        _follow_plans_source = source
+    return _follow_plans
+
+def _follow_paths(attrname, node):
+    """Returns the first followable path that starts at the attribute and ends in a non-node value
+    as a (path text, value text) pair, or None."""
+    for path, pathtxt in _get_follow_plans().get(attrname, ()):
+        current = node
+        for pathelem in path:
+            if not isinstance(current, P4Node) or (current := current.get_attr(pathelem)) is None:
+                break
+        else:
+            if not isinstance(current, P4Node):
+                return (pathtxt, f'{current}')
+    return None
+
+def _xdir_names(node):
+    """The sorted names of the noncommon attributes of the node; cached in the node while its keys stay the same."""
+    dct = node.__dict__
+    if (cache := dct.get('xdir_cache')) is not None and cache[0] == _xdir_generation and cache[1] == tuple(dct):
+        return cache[2]
+    names = sorted(d for d in dct if not d.startswith("__") if d not in P4Node.common_attrs if d != 'xdir_cache')
+    dct['xdir_cache'] = None
+    dct['xdir_cache'] = (_xdir_generation, tuple(dct), names)
+    return names
+
+def _xdir_details(node, d, show_colours):
+    attr = node.get_attr(d)
+
+    if type(attr) is types.FunctionType:
+        return ("=", "fun", clr_function)
+
+    if type(attr) is bool:
+        return ("=", "✘✓"[attr], clr_value)
+
+    if type(attr) is dict:
+        attrlen = len(attr)
+        return ("#", attrlen, clr_count if attrlen > 0 else clr_off)
+
+    if not isinstance(attr, P4Node):
+        if type(attr) is int and (value := int(attr)) > 0xFF:
+            if (typeattr := node.get_attr('type')) is not None and (sizeattr := typeattr.get_attr('size')) is not None:
+                hextxt = _c(f'0x{value:0{sizeattr//4}x}', clr_hex, show_colours)
+            else:
+                hextxt = _c(f'0x{value:08x}', clr_hex, show_colours)
+            return ("=", f'{attr}' or '""', clr_value, f'={hextxt}')
+        return ("=", f'{attr}' or '""', clr_value)
+
+    result = _follow_paths(d, attr)
+    if result is not None:
+        return (_c(f".{result[0]}", clr_extrapath, show_colours) + "=", result[1], clr_value)
+
+    if isinstance(subattr := attr.get_attr(d), P4Node) and subattr.vec is not None:
+        attrlen = len(subattr.vec)
+        return ("**", attrlen, clr_count if attrlen > 0 else clr_off)
+
+    if attr.vec is None:
+        attr_count = sum(1 for ad in attr.__dict__ if ad not in P4Node.common_attrs)
+        return (".", attr_count, clr_count if attr_count != 0 else clr_off)
+
+    attrlen = len(attr.vec)
+    return ("*", attrlen, clr_count if attrlen > 0 else clr_off)
+
+def _xdir_sort_key(entry):
+    """Empty dicts, vectors and nodes come first, then the nonempty ones, then the rest."""
+    _, det = entry
+    if det[0] not in _xdir_order_parts:
+        return -8
+    idx = _xdir_order_parts.index(det[0])
+    return -idx if det[1] == 0 else -4 - idx
+
+
+def default_max_vector_len(depth):
+    return 2 if depth > 2 or depth <= 0 else [8, 4][depth - 1]
+
+# texts that YAML would read as something other than a string (or as a document marker)
+_yaml_special_pattern = r'''^(?:~|null|Null|NULL|true|True|TRUE|false|False|FALSE|yes|Yes|YES|no|No|NO|on|On|ON|off|Off|OFF|y|Y|n|N|<<|=|---|\.\.\.
+                                  |[-+]?(?:0|[1-9][0-9_]*)|[-+]?0[0-7_]+|[-+]?0x[0-9a-fA-F_]+|0b[01_]+
+                                  |[-+]?(?:\.[0-9]+|[0-9][0-9_]*(?:\.[0-9_]*)?)(?:[eE][-+]?[0-9]+)?
+                                  |[-+]?\.(?:inf|Inf|INF)|\.(?:nan|NaN|NAN))$'''
+_yaml_special_re = None
+_yaml_indicators = '-?:,[]{}#&*!|>\'"%@`'
+
+def _is_yaml_special(txt):
+    global _yaml_special_re
+    if _yaml_special_re is None:
+        import re
+        _yaml_special_re = re.compile(_yaml_special_pattern, re.VERBOSE)
+    return _yaml_special_re.match(txt) is not None
+
+def _yaml_scalar(value):
+    """Formats a scalar as YAML would; coloured texts are written as they are."""
+    if value is None:
+        return 'null'
+    if type(value) is bool:
+        return 'true' if value else 'false'
+    if type(value) in (int, float):
+        return f'{value}'
+
+    txt = f'{value}'
+    if '\033' in txt:
+        return txt
+    import json
+    if not txt.isprintable():
+        return json.dumps(txt)
+    if txt == '' or txt[0] == ' ' or txt[-1] in ' :' or ': ' in txt or ' #' in txt or _is_yaml_special(txt) or (txt[0] in _yaml_indicators and (txt[0] not in '-?:' or txt[1:2] in ('', ' '))):
+        return json.dumps(txt) if "'" in txt else "'" + txt + "'"
+    return txt
+
+class _PrettyPrinter(object):
+    """Writes the content of json_repr in YAML block style, directly from the nodes.
+    Values are represented as (value, depth, is_top_level) triples, where depth is None for non-node values."""
+
+    def __init__(self, out, max_vector_len, show_colours):
+        self.out = out
+        self.max_vector_len = max_vector_len
+        self.show_colours = show_colours
+
+    def nodename(self, node):
+        name = node.__dict__.get('name', '')
+        node_type = node.__dict__.get('node_type', '')
+        return f"{_c(f'{name}', clr_value, self.show_colours)}{_c(f'#{node_type}', clr_nodetype, self.show_colours)}"
+
+    def node_entries(self, node, depth):
+        reprtype = _c(f"#{node.__dict__.get('node_type', '')}", clr_nodetype, self.show_colours)
+        for d in node.xdir(details=False, show_colours=False):
+            attr = node.get_attr(d)
+            vecpart = _c(f'*{len(attr)}', clr_count, self.show_colours) if isinstance(attr, P4Node) and attr and attr.is_vec() else ''
+            key = f'{_c(f".{d}", clr_attrname, self.show_colours)}{reprtype}{vecpart}'
+            yield (key, (attr, depth - 1, False) if isinstance(attr, P4Node) else (f'{attr}', None, False))
+
+    def vec_items(self, node, depth):
+        maxlen = self.max_vector_len(depth)
+        items = [(elem, depth if isinstance(elem, P4Node) else None, True) for elem in node.vec[:maxlen]]
+        if len(node.vec) > maxlen:
+            items.append((f'({len(node.vec) - maxlen} more elements, {len(node.vec)} in total)', None, False))
+        return items
+
+    def classify(self, value, depth, is_top_level):
+        """Returns ('scalar', text), ('map', entries) or ('seq', items)."""
+        if depth is None:
+            if type(value) in (list, tuple):
+                return ('seq', [(elem, None, False) for elem in value])
+            if type(value) is dict:
+                return ('map', [(f'{key}', (elem, None, False)) for key, elem in value.items()])
+            return ('scalar', _yaml_scalar(value))
 
-    nodetxt = f'{node}' if type(node) is not P4Node else node.name if 'name' in node else None
+        if depth <= 0:
+            return ('scalar', _yaml_scalar('...'))
+        if is_top_level:
+            return ('map', [(self.nodename(value), (value, depth, False))])
+        if value.is_vec():
+            return ('seq', self.vec_items(value, depth))
+        return ('map', list(self.node_entries(value, depth)))
+
+    def write_value(self, value, indent, lead):
+        """The first line starts with lead instead of the indentation."""
+        kind, content = self.classify(*value)
+        if kind == 'scalar':
+            self.out.write(f'{lead}{content}\n')
+        elif kind == 'map':
+            self.write_mapping(content, indent, lead)
+        else:
+            self.write_sequence(content, indent, lead)
 
-    if nodetxt is not None and type(node_or_value) is not P4Node and (valuetxt := f'{node_or_value}') in nodetxt:
-        matchtype = _paths_matchtype(nodetxt, valuetxt)
-        yield (path, matchtype, nodetxt, node)
-        return
+    def write_mapping(self, entries, indent, lead):
+        if entries == []:
+            self.out.write(f'{lead}{{}}\n')
+            return
 
-    founds = found_nodes.copy()
-    founds.add(node)
+        for key, value in sorted(entries, key=lambda entry: entry[0]):
+            keytxt = f'{lead}{_yaml_scalar(key)}:'
+            lead = ' ' * indent
+
+            kind, content = self.classify(*value)
+            if kind == 'scalar':
+                self.out.write(f'{keytxt} {content}\n')
+            elif content == []:
+                self.out.write(f'{keytxt} {"{}" if kind == "map" else "[]"}\n')
+            elif kind == 'map':
+                self.out.write(f'{keytxt}\n')
+                self.write_mapping(content, indent + 2, ' ' * (indent + 2))
+            else:
+                self.out.write(f'{keytxt}\n')
+                self.write_sequence(content, indent, ' ' * indent)
+
+    def write_sequence(self, items, indent, lead):
+        if items == []:
+            self.out.write(f'{lead}[]\n')
+            return
 
-    for key, new_node in _paths_new_nodes(node, founds):
-        if type(new_node) is P4Node and new_node not in founds:
-            yield from _paths_to_recurse(new_node, node_or_value, max_depth - 1, path + [key], founds)
+        for item in items:
+            self.write_value(item, indent + 2, f'{lead}- ')
+            lead = ' ' * indent
+
+
+def pretty_print(node, depth=3, out=None, max_vector_len=default_max_vector_len, show_colours=True):
+    """Writes the node in a YAML-like format, with the same content as json_repr(depth).
+    Vectors are shortened according to max_vector_len(depth)."""
+    printer = _PrettyPrinter(out or sys.stdout, max_vector_len, show_colours)
+    printer.write_value((node, depth, True), 0, '')
 
 
 class P4Node(object):
@@ -208,13 +461,16 @@ class P4Node(object):
     common_attrs = set((
         "Node_Type",
         "Node_ID",
-        "node_parents",
+        "node_parent_links",
         "vec",
         "is_vec",
         "set_vec",
         "json_data",
         "node_type",
         "xdir",
+        "xdir_cache",
+        "attr_observers",
+        "cow_copies",
         "remove_attr",
         "get_attr",
         "set_attr",
@@ -291,13 +547,13 @@ class P4Node(object):
         """A textual representation of a P4 HLIR node."""
         if self.is_vec() and details:
             def elem_print(node):
-                if type(node) is P4Node and node.is_vec() and len(node.vec) > 0 and type(node.vec[0]) is P4Node:
+                if isinstance(node, P4Node) and node.is_vec() and len(node.vec) > 0 and isinstance(node.vec[0], P4Node):
                     counts = sorted(collections.Counter(node.map('node_type')).items())
                     vecname = node.node_type[: node.node_type.find('<')]
                     return ', '.join(f'{_c(vecname, clr_nodetype)}<{_c(ntype, clr_nodetype)}*{_c(count, clr_count)}>' for ntype, count in counts)
                 return f'{node}'
 
-            if len(self.vec) > 0 and type(self.vec[0]) is P4Node:
+            if len(self.vec) > 0 and isinstance(self.vec[0], P4Node):
                 veclen = len(f'{len(self.vec)}')
                 fmt    = f'{{0:>{veclen}}} {{1}}'
                 return '\n'.join((f'{idx:>{veclen}} {elem_print(elem)}' for idx, elem in enumerate(self.vec)))
@@ -327,7 +583,7 @@ class P4Node(object):
 
         if type(key) == int or type(key) == slice:
             return self.vec[key]
-        return P4Node({'node_type': '<vec>'}, [node for node in self.vec if type(node) is P4Node if node.node_type == key])
+        return P4Node({'node_type': '<vec>'}, [node for node in self.vec if isinstance(node, P4Node) if node.node_type == key])
 
     def __len__(self):
         if self.vec is None:
@@ -340,41 +596,34 @@ class P4Node(object):
                 yield x
 
     def __truediv__(self, node_or_value, max_depth=20):
-        if type(node := node_or_value) is P4Node:
+        if isinstance(node := node_or_value, P4Node):
             paths_to(self, node, max_depth=max_depth, sort_by_path_length=False)
         else:
             paths_to(self, f'{node_or_value}', max_depth=max_depth, sort_by_path_length=False)
 
     def __floordiv__(self, node_or_value, max_depth=20):
-        if type(node := node_or_value) is P4Node:
+        if isinstance(node := node_or_value, P4Node):
             paths_to(self, node, max_depth=max_depth, sort_by_path_length=True)
         else:
             paths_to(self, f'{node_or_value}', max_depth=max_depth, sort_by_path_length=True)
 
+    def paths_to(self, node_or_value, max_depth=20, sort_by_path_length=False, max_results=None, time_budget=None, use_index=False):
+        return paths_to(self, node_or_value, max_depth=max_depth, sort_by_path_length=sort_by_path_length, max_results=max_results, time_budget=time_budget, use_index=use_index)
+
     def by_type(self, typename, strict=False):
         def is_right_type(t):
             return t == typename or (not strict and t == f'Type_{typename}')
         return P4Node([f for f in self.vec if is_right_type(f.node_type)])
 
     def parent(self):
-        return self.node_parents[0][-1] if self.node_parents != [] else None
+        return self.node_parent_links[0][0] if self.node_parent_links != [] else None
 
     def __lt__(self, depth):
         """This is not a proper comparison operator.
         Rather, it pretty prints the node to the standard output.
         You can use it as the postfix "love operator" on a node: `node<3` """
-        import json
-        from ruamel import yaml
-        import re
-
-        depth = max(1, depth+1)
-
-        dumped = yaml.dump(yaml.safe_load(json.dumps(self.json_repr(depth))), default_flow_style=False)
-        ascii_escape = '\033'
-        dumped = re.sub(r'\\e\[0m\"', '\\\\e[0m', dumped)
-        dumped = re.sub(r'\"\\e',     '\\\\e', dumped)
-        dumped = re.sub(r'\\e[ ]*',    ascii_escape, dumped)
-        print(dumped)
+        pretty_print(self, max(1, depth+1))
+        print()
 
         return None
 
@@ -394,7 +643,7 @@ class P4Node(object):
         node = self
 
         prevs = set()
-        while type(node) is P4Node and node not in prevs:
+        while isinstance(node, P4Node) and node not in prevs:
             prevs.add(node)
             if "type" in node:
                 node = node.type
@@ -407,14 +656,32 @@ class P4Node(object):
                 continue
         return node
 
+    def _parent_chain(self):
+        """The nodes from the root HLIR node to the parent of self, following the first parent link of each node."""
+        chain = []
+        seen = {id(self)}
+        node = self
+        while (links := node.node_parent_links) != [] and id(node := links[0][0]) not in seen:
+            seen.add(id(node))
+            chain.append(node)
+        return chain[::-1]
+
     def _parents(self):
         """Returns a path from the root HLIR node to self.
         Usually it is the only such path."""
 
-        return P4Node(self.node_parents[0])
+        return P4Node(self._parent_chain())
 
     def _parent(self):
-        return self.node_parents[0][-1]
+        return self.node_parent_links[0][0] if self.node_parent_links != [] else None
+
+    def _node_parents(self):
+        """The paths from the root HLIR node to self, one for each parent (the root has one empty path);
+        the links are stored in node_parent_links, a parent may link to self under several keys."""
+        if self.node_parent_links == []:
+            return [[]]
+        parents = {id(parent): parent for parent, key in self.node_parent_links}
+        return [parent._parent_chain() + [parent] for parent in parents.values()]
 
     @staticmethod
     def _get_filter_fun(fun_or_path, value):
@@ -508,7 +775,7 @@ class P4Node(object):
             return P4Node(sorted(self.vec, key=key, reverse=reverse))
         return None
 
-    def json_repr(self, depth=3, max_vector_len=lambda depth: 2 if depth > 2 or depth <= 0 else [8, 4][depth - 1], is_top_level = True):
+    def json_repr(self, depth=3, max_vector_len=default_max_vector_len, is_top_level = True):
         if depth <= 0:
             return "..."
 
@@ -519,7 +786,7 @@ class P4Node(object):
         if self.is_vec():
             maxlen = max_vector_len(depth)
             selflen = len(self.vec)
-            repr = [e.json_repr(depth, is_top_level = True) if type(e) is P4Node else e for e in self.vec[:maxlen]]
+            repr = [e.json_repr(depth, is_top_level = True) if isinstance(e, P4Node) else e for e in self.vec[:maxlen]]
             if selflen > maxlen:
                 repr += [f"({selflen - maxlen} more elements, {selflen} in total)"]
         else:
@@ -527,10 +794,10 @@ class P4Node(object):
             for d in self.xdir(details=False, show_colours=False):
                 reprattrname = _c(f".{d}", clr_attrname)
                 reprtype = _c(fld_repr('node_type', "#"), clr_nodetype)
-                vecpart = _c(f'*{len(subnode)}', clr_count) if (subnode := self.get_attr(d)) and type(subnode) is P4Node and subnode.is_vec() else ''
+                vecpart = _c(f'*{len(subnode)}', clr_count) if (subnode := self.get_attr(d)) and isinstance(subnode, P4Node) and subnode.is_vec() else ''
                 reprfld = f"{reprattrname}{reprtype}{vecpart}"
 
-                if type(attr := self.get_attr(d)) is P4Node:
+                if isinstance(attr := self.get_attr(d), P4Node):
                     repr[reprfld] = attr.json_repr(depth-1, is_top_level = False)
                 else:
                     repr[reprfld] = f'{attr}'
@@ -540,21 +807,29 @@ class P4Node(object):
         return { nodename: repr } if is_top_level else repr
 
     def remove_attr(self, key):
-        del self.__dict__[key]
+        self.del_attr(key)
 
     def set_attr(self, key, value):
-        """Sets an attribute of the object."""
-        self.__dict__[key] = value
+        """Sets an attribute of the object, and notifies the observers of the node (see observe)."""
+        dct = self.__dict__
+        if observers := dct.get('attr_observers'):
+            _notify(observers, self, key, dct.get(key), value)
+        dct[key] = value
 
     def del_attr(self, key):
-        """Deletes an attribute of the object."""
-        del self.__dict__[key]
+        """Deletes an attribute of the object, and notifies the observers of the node (see observe)."""
+        dct = self.__dict__
+        if observers := dct.get('attr_observers'):
+            _notify(observers, self, key, dct[key], None)
+        del dct[key]
 
     @staticmethod
     def define_common_attrs(attr_names):
         """The attribute names in the list will not be listed
         by the str and xdir operations."""
+        global _xdir_generation
         P4Node.common_attrs.update(attr_names)
+        _xdir_generation += 1
 
     def get_attr(self, key):
         return self.__dict__[key] if key in self.__dict__ else None
@@ -580,6 +855,8 @@ class P4Node(object):
             return self._parent()()
         if key == 'parents':
             return self._parents()
+        if key == 'node_parents':
+            return self._node_parents()
 
         if key.startswith('__') or key == 'vec':
             return object.__getattr__(self, key)
@@ -638,84 +915,17 @@ class P4Node(object):
 
     def xdir(self, details=False, show_colours=True, depth=0):
         """Lists the noncommon attributes of the node."""
-        def follow_path(node, path):
-            prev_node = node
-            for idx, pathelem in enumerate(path):
-                if not isinstance(node, P4Node):
-                    retval = P4Node({'name': 'INVALID', 'node_type': 'INVALID'})
-                    retval.original_node = node
-                    retval.original_path = path
-                    retval.last_good_node = prev_node
-                    retval.remaining_path = path[idx:]
-                    return retval
-
-                prev_node = node
-                node = node.get_attr(pathelem)
-                if node is None:
-                    return None
-
-            return (".".join(path), f'{node}') if type(node) is not P4Node else None
-
-
-        def follow_paths(attrname, node):
-            for path in (split[1:] for p in P4Node.followable_paths if (split := p.split('.'))[0] == attrname):
-                if result := follow_path(node, path):
-                    return result
-            return None
-
-        def short_attrs():
-            return (d for d in dir(self) if not d.startswith("__") if d not in P4Node.common_attrs)
-
-        def get_details(d):
-            if not details or type(d) not in [str, bytes]:
-                return ("", "", clr_value)
-
-            attr = self.get_attr(d)
-
-            if type(attr) is types.FunctionType:
-                return ("=", "fun", clr_function)
-
-            if type(attr) is bool:
-                return ("=", "✘✓"[attr], clr_value)
-
-            if type(attr) is dict:
-                attrlen = len(attr)
-                return ("#", attrlen, clr_count if attrlen > 0 else clr_off)
-
-            if type(attr) is not P4Node:
-                if type(attr) is int and (value := int(attr)) > 0xFF:
-                    if (typeattr := self.get_attr('type')) is not None and (sizeattr := typeattr.get_attr('size')) is not None:
-                        hextxt = _c(f'0x{value:0{sizeattr//4}x}', clr_hex)
-                    else:
-                        hextxt = _c(f'0x{value:08x}', clr_hex)
-                    return ("=", f'{attr}' or '""', clr_value, f'={hextxt}')
-                return ("=", f'{attr}' or '""', clr_value)
-
-            result = follow_paths(d, attr)
-            if result is not None:
-                return (_c(f".{result[0]}", clr_extrapath) + "=", result[1], clr_value)
-
-            if type(attr.get_attr(d)) is P4Node and attr.get_attr(d).vec is not None:
-                attrlen = len(attr.get_attr(d).vec)
-                return ("**", attrlen, clr_count if attrlen > 0 else clr_off)
-
-            if attr.vec is None:
-                attr_count = sum(1 for ad in attr.__dict__ if ad not in P4Node.common_attrs)
-                return (".", attr_count, clr_count if attr_count != 0 else clr_off)
-
-            attrlen = len(attr.vec)
-            return ("*", attrlen, clr_count if attrlen > 0 else clr_off)
-
-        def condfun(data):
-            """Returns the index of the first condition that holds."""
-            _, det = data
-            parts = "# ** * .".split(' ')
-            conds = [det[0:2] == (part, 0) for part in parts] + [det[0] == part for part in parts] + [True]
-            return -list(dropwhile(lambda x: not x[1], enumerate(conds)))[0][0]
-
-        return [_c(d, clr_attrname if attr_details[2] != clr_off else clr_off, show_colours) + attr_details[0] + _c(attr_details[1], attr_details[2], show_colours) + ''.join(txt for txt in attr_details[3:])
-                    for d, attr_details in sorted(((d, get_details(d)) for d in short_attrs()),
-                                                  key = condfun)]
+        names = _xdir_names(self)
+        if not details:
+            if not show_colours or _colours() is None:
+                return list(names)
+            return [_c(d, clr_attrname) + _c("", clr_value) for d in names]
+
+        entries = sorted(((d, _xdir_details(self, d, show_colours)) for d in names), key=_xdir_sort_key)
+        if not show_colours or _colours() is None:
+            return [f'{d}{det[0]}{det[1]}' + ''.join(det[3:]) for d, det in entries]
+        return [_c(d, clr_attrname if det[2] != clr_off else clr_off) + det[0] + _c(det[1], det[2]) + ''.join(det[3:])
+                    for d, det in entries]
 
     def str(self, show_name=True, show_type=True, show_funs=True, details=True, show_colours=True, depth=0):
         return P4Node.__str__(self, show_name, show_type, show_funs, details, show_colours, depth)
@@ -738,24 +948,130 @@ class P4Node(object):
         return elem1
 
 
-def deep_copy(node, seen_ids = [], on_error = lambda x: None):
-    new_p4node = P4Node({'node_type': 'DEEP_COPIED_NODE'})
-    new_p4node.is_copied = True
-
-    if node.id in seen_ids:
-        on_error(node.id)
-
-    for c in node.__dict__:
-        if c not in node.xdir(details=False) and not c.startswith("__"):
-            new_p4node.set_attr(c, node.get_attr(c))
-
-    if node.is_vec():
-        new_p4node.set_vec([deep_copy(elem, seen_ids + [node.id]) for elem in node.vec])
+# links that deep_copy does not descend into: the copy refers to the same node as the original
+default_shared_links = ('ref', 'type_ref', 'header_ref', 'field_ref', 'control')
+
+def _notify(observers, node, key, old_value, new_value):
+    for observer in observers:
+        observer.on_change(node, key, old_value, new_value)
+    if type(new_value) is P4Node and new_value.__dict__.get('attr_observers') is not observers:
+        if (new_nodes := _spread_observers(new_value, observers)) != []:
+            for observer in observers:
+                observer.on_new_nodes(new_nodes)
+
+def _spread_observers(root, observers):
+    """Sets the observer list in the nodes reachable from root that do not have it yet, and returns these nodes."""
+    new_nodes = []
+    todo = [root]
+    while todo != []:
+        node = todo.pop()
+        dct = node.__dict__
+        if dct.get('attr_observers') is observers:
+            continue
+        dct['attr_observers'] = observers
+        new_nodes.append(node)
+        todo.extend(elem for elem in node.vec or () if type(elem) is P4Node)
+        todo.extend(value for key, value in dct.items() if type(value) is P4Node if key not in P4Node.common_attrs)
+    return new_nodes
+
+def observe(root, observer):
+    """Makes the nodes reachable from root (and the ones that become reachable through set_attr) notify the observer.
+    Before set_attr or del_attr changes an attribute, observer.on_change(node, key, old_value, new_value) is called
+    (new_value is None on deletion); the nodes that newly become reachable are passed to observer.on_new_nodes(nodes).
+    The nodes share one observer list with root; plain assignments (node.key = value) are not observed."""
+    if (observers := root.get_attr('attr_observers')) is None:
+        observers = []
+        _spread_observers(root, observers)
+    if observer not in observers:
+        observers.append(observer)
+
+def unobserve(root, observer):
+    if observer in (observers := root.get_attr('attr_observers') or []):
+        observers.remove(observer)
+
+def shallow_copy(node):
+    """Returns a new node with the same attributes as the node and a copy of its vector.
+    The copy does not notify the observers of the node."""
+    new_node = P4Node.__new__(P4Node)
+    dct = {key: value for key, value in node.__dict__.items() if key not in ('xdir_cache', 'attr_observers')}
+    if (vec := dct.get('vec')) is not None:
+        dct['vec'] = vec.copy()
+    object.__setattr__(new_node, '__dict__', dct)
+    return new_node
+
+def _copied_links(node, shared_links):
+    """The (key, subnode) pairs of the node that are copied by deep_copy."""
+    if node.vec is not None:
+        if type(node.vec) is dict:
+            return [(key, elem) for key, elem in node.vec.items() if type(elem) is P4Node]
+        return [(idx, elem) for idx, elem in enumerate(node.vec) if type(elem) is P4Node]
+    return [(key, value) for key, value in node.__dict__.items() if type(value) is P4Node if key not in P4Node.common_attrs if key not in shared_links]
+
+def _set_link(node, key, value):
+    if type(key) is int or node.vec is not None:
+        node.vec[key] = value
+    else:
+        node.set_attr(key, value)
+
+def deep_copy(node, on_error=lambda node_id: None, shared_links=default_shared_links, memo=None, copy_on_write=False):
+    """Copies the node and the nodes reachable from it, except through the shared links.
+    The copy has the same structure: a node that is reachable in many ways is copied only once.
+    If a node is reachable from itself, on_error is called with its Node_ID, and the copy will contain the same cycle.
+    The memo (original node -> copy) can be shared between calls to keep the structure of several copies.
+    In copy-on-write mode, only the node itself is copied, the rest is shared with the original
+    until make_writable is called on a path of the copy."""
+    if copy_on_write:
+        new_node = shallow_copy(node)
+        new_node.is_copied = True
+        new_node.cow_copies = {new_node: new_node}
+        return new_node
+
+    memo = {} if memo is None else memo
+    if node in memo:
+        return memo[node]
+
+    memo[node] = new_node = shallow_copy(node)
+    new_node.__dict__['is_copied'] = True
+
+    on_path = {node}
+    stack = [(node, new_node, iter(_copied_links(node, shared_links)))]
+    while stack != []:
+        orig, copied, links = stack[-1]
+        for key, subnode in links:
+            if subnode in memo:
+                if subnode in on_path:
+                    on_error(subnode.Node_ID)
+                _set_link(copied, key, memo[subnode])
+                continue
 
-    for d in node.xdir(details=False):
-        if type(node.get_attr(d)) == P4Node and d not in ['ref', 'type_ref', 'header_ref', 'field_ref', 'control']:
-            new_p4node.set_attr(d, deep_copy(node.get_attr(d), seen_ids + [node.id]))
+            memo[subnode] = new_subnode = shallow_copy(subnode)
+            new_subnode.__dict__['is_copied'] = True
+            _set_link(copied, key, new_subnode)
+            on_path.add(subnode)
+            stack.append((subnode, new_subnode, iter(_copied_links(subnode, shared_links))))
+            break
         else:
-            new_p4node.set_attr(d, node.get_attr(d))
-
-    return new_p4node
+            stack.pop()
+            on_path.discard(orig)
+
+    return new_node
+
+def make_writable(cow_node, path):
+    """Makes the nodes along the path of a copy-on-write copy (see deep_copy) its own, and returns the last one.
+    The path is a dot separated sequence of attributes (as in __call__), or a list of attributes and vector indices.
+    A node that is shared in several places of the original is copied only once."""
+    copies = cow_node.cow_copies
+    node = cow_node
+    for key in path.split('.') if type(path) is str else path:
+        subnode = node.vec[key] if type(key) is int else node.get_attr(key)
+        if type(subnode) is not P4Node:
+            raise AttributeError(f"Key '{key}' of the path {path} does not lead to a node from #{node.Node_ID}")
+
+        if subnode not in copies:
+            copies[subnode] = new_subnode = shallow_copy(subnode)
+            new_subnode.__dict__['is_copied'] = True
+            copies[new_subnode] = new_subnode
+        _set_link(node, key, copies[subnode])
+        node = copies[subnode]
+
+    return node
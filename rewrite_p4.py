@@ -7,7 +7,6 @@
 # run as: PYTHONPATH=.. python3 rewrite_p4.py
 
 import os
-import ujson
 import hlir16.hlir
 import hlir16.load_p4
 
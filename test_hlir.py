@@ -6,11 +6,15 @@
 from hlir16.p4node import P4Node
 import hlir16.hlir
 from hlir16.hlir_attrs import set_additional_attrs
+from hlir16.hlir_json import load_json
+import hlir16.hlir_json
 
 import sys
 import pprint
 import os.path
 
+import pytest
+
 
 def indentprint(data):
     lines = pprint.pformat(data).splitlines(True)
@@ -21,9 +25,7 @@ def load_p4(p4_file, p4_version=16, add_attrs=True):
     p4_file = os.path.expandvars(p4_file)
     json_filename = hlir16.hlir.p4_to_json(p4_file)
 
-    import simdjson
-    with open(json_filename, 'r') as json:
-        json_contents = simdjson.load(json)
+    json_contents = load_json(json_filename)
 
     hlir = hlir16.hlir.walk_json_from_top(json_contents)
     if type(error_code := hlir) is not P4Node:
@@ -31,72 +33,329 @@ def load_p4(p4_file, p4_version=16, add_attrs=True):
         sys.exit(error_code)
 
     if add_attrs:
-        set_additional_attrs(hlir, p4_version)
+        set_additional_attrs(hlir, p4_file, p4_version)
+
+    return hlir
+
+
+def load_fixture(name='small_v1model', add_attrs=True):
+    """Loads a JSON file of bench_corpus (see gen_p4json.py), without calling p4test."""
+    from hlir16.bench_corpus import default_corpus_dir, read_text
+    json_contents = hlir16.hlir_json.loads_json(read_text(os.path.join(default_corpus_dir, f'{name}.json.gz')))
+
+    hlir = hlir16.hlir.walk_json_from_top(json_contents)
+    if add_attrs:
+        set_additional_attrs(hlir, f'{name}.p4', 16)
 
     return hlir
 
 
+def test_shared_view_is_read_only():
+    from hlir16.hlir_shared import publish_hlir, attach_hlir
+
+    filename = publish_hlir(load_fixture())
+    try:
+        hlir = attach_hlir(filename)
+        ctl = hlir.controls[0]
+        name = ctl.name
+        changes = [
+            lambda: setattr(ctl, 'name', 'changed'),
+            lambda: delattr(ctl, 'name'),
+            lambda: ctl.set_attr('name', 'changed'),
+            lambda: ctl.del_attr('name'),
+            lambda: ctl.remove_attr('name'),
+            lambda: hlir.controls.append(ctl),
+            lambda: hlir.controls.set_vec([]),
+        ]
+        for change in changes:
+            with pytest.raises(AttributeError):
+                change()
+
+        assert ctl.name == name
+        assert hlir.controls[0] is ctl
+        assert len(hlir.controls) > 0
+        hlir._shared.close()
+    finally:
+        os.remove(filename)
+
+
+def test_hash_consing_keeps_node_index():
+    from hlir16.hlir_columns import number_nodes, is_indexed
+    from hlir16.hlir_hash import hash_cons_types
+
+    hlir = load_fixture()
+    number_nodes(hlir)
+    nodes_before = len(hlir.all_nodes)
+    assert len(hlir.indexed_nodes) == nodes_before
+
+    stats = hash_cons_types(hlir)
+
+    assert stats['removed_nodes'] > 0
+    assert len(hlir.all_nodes) == len(hlir.indexed_nodes) == nodes_before - stats['removed_nodes']
+    assert all(is_indexed(hlir, node) for node in hlir.all_nodes.vec)
+
+
+def indexed_refs(index):
+    return {(id(target), id(node), link) for target, referrers in index.refs.items() for node, link in referrers}
+
+
+def test_ref_index_follows_subtree_changes():
+    from hlir16.hlir_refindex import RefIndex, build_ref_index, detached_node_types
+    from hlir16.hlir_utils import reachable_nodes
+
+    def check_index(hlir, index):
+        index.drop_detached()
+        fresh = RefIndex()
+        for node in reachable_nodes(hlir, detached_node_types):
+            fresh.add_node(node)
+        assert indexed_refs(index) == indexed_refs(fresh)
+
+    hlir = load_fixture()
+    index = build_ref_index(hlir)
+    field = next(fld for fld in hlir.all_nodes.by_type('StructField') if fld.type.node_type == 'Type_Name' if 'type_ref' in fld.type)
+    type_name = field.type
+    target = type_name.type_ref
+    referrers = len(index.referrers(target))
+    assert type_name in index.referrers(target)
+
+    # replacing a subtree drops its links
+    field.set_attr('type', P4Node({'node_type': 'Dummy'}))
+    assert type_name not in index.referrers(target)
+    assert len(index.referrers(target)) == referrers - 1
+    check_index(hlir, index)
+
+    # a detached node is not followed any more
+    type_name.set_attr('type_ref', hlir.headers[1])
+    assert type_name not in index.referrers(hlir.headers[1])
+
+    # re-attaching it indexes its current links
+    field.set_attr('type', type_name)
+    assert type_name in index.referrers(hlir.headers[1])
+    type_name.set_attr('type_ref', target)
+    assert len(index.referrers(target)) == referrers
+    check_index(hlir, index)
+
+    # deleting a subtree drops its links
+    field.del_attr('type')
+    assert len(index.referrers(target)) == referrers - 1
+    check_index(hlir, index)
+
+    # the links of nodes linked in by set_attr are indexed
+    new_node = P4Node({'node_type': 'Dummy', 'type_ref': target})
+    hlir.set_attr('dummy', new_node)
+    assert new_node in index.referrers(target)
+    check_index(hlir, index)
+
+
+def test_text_index_staleness():
+    from hlir16.p4node import iter_paths_to
+    from hlir16.hlir_textindex import get_text_index
+
+    def found_nodes(paths):
+        return [node for _, _, _, node in paths]
+
+    hlir = load_fixture()
+    ctl = hlir.controls[0]
+    index = get_text_index(hlir)
+    assert ctl in found_nodes(index.iter_paths(ctl.name))
+
+    # changes of nodes that are not indexed, e.g. failed path lookups, keep the index
+    hlir('no.such.path')
+    assert not index.is_stale
+
+    ctl.set_attr('name', 'RenamedCtl')
+    assert index.is_stale
+    index = get_text_index(hlir)
+    assert ctl in found_nodes(index.iter_paths('RenamedCtl'))
+
+    # plain assignments are not observed, the searches only use the index if asked to
+    ctl.name = 'PlainRenamedCtl'
+    assert not index.is_stale
+    assert ctl in found_nodes(iter_paths_to(hlir, 'PlainRenamedCtl'))
+    assert ctl in found_nodes(hlir.paths_to('PlainRenamedCtl'))
+    assert found_nodes(hlir.paths_to('PlainRenamedCtl', use_index=True)) == []
+
+    index.mark_stale()
+    assert ctl in found_nodes(hlir.paths_to('PlainRenamedCtl', use_index=True))
+
+
+def test_fingerprint_diff_round_trip():
+    from hlir16.bench_corpus import default_corpus_dir, read_text
+    from hlir16.hlir_diff import diff_hlirs, fingerprint
+
+    def shift_node_ids(value, offset):
+        if type(value) is dict:
+            return {key: elem + offset if key == 'Node_ID' else shift_node_ids(elem, offset) for key, elem in value.items()}
+        if type(value) is list:
+            return [shift_node_ids(elem, offset) for elem in value]
+        return value
+
+    old = load_fixture()
+    json_contents = hlir16.hlir_json.loads_json(read_text(os.path.join(default_corpus_dir, 'small_v1model.json.gz')))
+    new = hlir16.hlir.walk_json_from_top(shift_node_ids(json_contents, 100000))
+    set_additional_attrs(new, 'small_v1model.p4', 16)
+
+    # the fingerprints do not depend on the Node_IDs
+    assert new.tables[0].Node_ID != old.tables[0].Node_ID
+    assert fingerprint(new) == fingerprint(old)
+    assert diff_hlirs(old, new) == {}
+    assert fingerprint(load_fixture('many_tables')) != fingerprint(old)
+
+    table = new.tables[0]
+    table_key = table.get_attr('canonical_name') or table.name
+    name = table.name
+
+    table.set_attr('name', 'renamed')
+    new.__dict__.pop('fingerprints')
+    assert table_key in diff_hlirs(old, new)['tables']['changed']
+    assert table_key in diff_hlirs(new, old)['tables']['changed']
+
+    new.tables.vec.remove(table)
+    new.__dict__.pop('fingerprints')
+    assert diff_hlirs(old, new)['tables']['removed'] == [table_key]
+    assert diff_hlirs(new, old)['tables']['added'] == [table_key]
+
+    new.tables.vec.insert(0, table)
+    table.set_attr('name', name)
+    new.__dict__.pop('fingerprints')
+    assert diff_hlirs(old, new) == {}
+    assert fingerprint(new) == fingerprint(old)
+
+
+def test_fork_isolation():
+    from hlir16.hlir_fork import fork, writable, is_own, changed_nodes
+    from hlir16.hlir_diff import diff_hlirs, fingerprint
+
+    reference = load_fixture()
+    hlir = load_fixture()
+    fingerprint(hlir)
+
+    variant = fork(hlir)
+    table = hlir.tables[0]
+    name = table.name
+    writable(variant, table).name = 'renamed'
+
+    assert variant.tables[0].name == 'renamed'
+    assert hlir.tables[0] is table and table.name == name
+    assert is_own(variant, variant.tables[0]) and not is_own(variant, table)
+    assert variant.tables[1] is hlir.tables[1]
+    assert variant.tables[0] in changed_nodes(variant)
+
+    # forks of forks
+    variant2 = fork(variant)
+    writable(variant2, table).name = 'renamed again'
+    assert variant2.tables[0].name == 'renamed again'
+    assert variant.tables[0].name == 'renamed'
+    assert table.name == name
+
+    # the forks do not inherit the cached fingerprints of the HLIR, and writable drops their own
+    table_key = table.get_attr('canonical_name') or name
+    assert table_key in diff_hlirs(reference, variant)['tables']['changed']
+    assert table_key in diff_hlirs(reference, variant2)['tables']['changed']
+    other_table = hlir.tables[1]
+    writable(variant, other_table).name = 'renamed'
+    assert (other_table.get_attr('canonical_name') or other_table.name) in diff_hlirs(reference, variant)['tables']['changed']
+    hlir.__dict__.pop('fingerprints')
+    assert diff_hlirs(reference, hlir) == {}
+
+
+def test_shard_round_trip_keeps_links():
+    from hlir16.hlir_shard import shard_hlir, load_shared, load_unit, unit_closure
+    from hlir16.hlir_utils import reachable_nodes, subnodes
+
+    hlir = load_fixture()
+    work_units = list(hlir.controls) + list(hlir.parsers)
+    shards = shard_hlir(hlir)
+    shared = load_shared(shards.shared_data())
+    units = {name: load_unit(shards.unit_data(name), shared) for name in shards.units}
+    assert set(units) == {unit.name for unit in work_units}
+
+    for unit in work_units:
+        loaded = units[unit.name]
+        nodes = [node for node in reachable_nodes(loaded) if node.node_type != 'INVALID']
+        assert sorted(node.Node_ID for node in nodes) == sorted(node.Node_ID for node in unit_closure(hlir, unit))
+
+        # parent navigation works within the slice
+        assert loaded.parent() is None
+        node_ids = {id(node) for node in nodes}
+        for node in nodes:
+            if 'node_parent_links' in node and (parent := node.parent()) is not None:
+                assert id(parent) in node_ids
+                assert any(subnode is node for _, subnode in subnodes(parent))
+                assert all(id(chain_node) in node_ids for chain_node in node._parent_chain())
+
+    # the nodes that are used by several slices are loaded once
+    param_types = [units[ctl.name].type.applyParams.parameters[1].type.type_ref for ctl in hlir.controls]
+    assert all(param_type is param_types[0] for param_type in param_types)
+    assert any(param_types[0] is node for node in shared)
+
+
+def test_no_eager_imports():
+    """The main modules do not import the modules that are imported on demand.
+    The import times are not checked here, as they depend on the load of the machine (see bench_import.py)."""
+    from hlir16.bench_import import check_imports, default_budgets
+    assert check_imports(list(default_budgets), budgets={}, repeat=1) == []
+
+
 if __name__ == "__main__":
     if len(sys.argv) <= 1:
         print("TODO usage")
         sys.exit()
 
-    program = load_p4(sys.argv[1])
     p4_version = int(sys.argv[2]) if len(sys.argv) > 2 else 16
 
-    hlir = load_p4(program, p4_version)
-
-    decltypes = [
-        'Declaration_Instance',
-        'Declaration_MatchKind',
-        'Method',
-        'P4Control',
-        'P4Parser',
-        'Type_Control',
-        'Type_Error',
-        'Type_Extern',
-        'Type_Header',
-        'Type_Package',
-        'Type_Parser',
-        'Type_Struct',
-        'Type_Typedef',
+    hlir = load_p4(sys.argv[1], p4_version)
+
+    groups = [
+        'control_types',
+        'controls',
+        'decl_instances',
+        'decl_matchkinds',
+        'enums',
+        'errors',
+        'externs',
+        'headers',
+        'methods',
+        'packages',
+        'parsers',
+        'type_parsers',
+        'typedefs',
     ]
 
-    for decltype in decltypes:
-        print(decltype)
-        indentprint(program.declarations[decltype])
+    for group in groups:
+        print(group)
+        indentprint(hlir(group).vec)
 
     print("-----------------------")
 
-    print(program)
-    print(program.is_vec())
-    print(program.xdir())
+    print(hlir)
+    print(hlir.is_vec())
+    print(hlir.xdir())
 
     print("-----------------------")
 
-    print(program.declarations)
+    print(hlir.controls)
 
     print("-----------------------")
 
-    print(program.declarations.xdir())
-    print(program.declarations.is_vec())
-    print(len(program.declarations))
+    print(hlir.controls.xdir())
+    print(hlir.controls.is_vec())
+    print(len(hlir.controls))
 
     print("-----------------------")
 
-    for idx, e in enumerate(program.declarations):
-        print(idx, program.declarations[idx])
+    for idx, e in enumerate(hlir.controls):
+        print(idx, hlir.controls[idx])
 
-    pprint.pprint(program.declarations['Type_Control'])
-    pprint.pprint(program.declarations['Type_Control'][0].applyParams.parameters.vec)
-    for decl in program.declarations['Type_Control']:
-        for e in decl.applyParams.parameters.vec:
+    pprint.pprint(hlir.controls[0].type.applyParams.parameters.vec)
+    for decl in hlir.controls:
+        for e in decl.type.applyParams.parameters.vec:
             if e.type is None:
                 continue
-            print(decl.name, e.direction, e.type.path, e.type.path.name, e.type.path.absolute, e.name, e.id)
+            print(decl.name, e.direction, e.type.node_type, e.type.get_attr('path'), e.name, e.id)
 
     # Note: it is also possible to set custom attributes
-    program.add_attrs({'controls': program.declarations['Type_Control']})
+    hlir.set_attr('my_controls', hlir.controls)
 
-    print(len(program.controls))
-    print(program.controls[0].applyParams.parameters[0].name)
+    print(len(hlir.my_controls))
+    print(hlir.my_controls[0].type.applyParams.parameters[0].name)